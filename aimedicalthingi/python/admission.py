@@ -0,0 +1,214 @@
+import threading
+import time
+from collections import deque
+
+# Idle rate-limit buckets are dropped once this many clients are tracked
+MAX_TRACKED_CLIENTS = 10000
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is turned away; carries the HTTP status and Retry-After."""
+
+    def __init__(self, status_code, reason, retry_after):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+class TokenBucket:
+    """Classic token bucket: refills at rate tokens/second up to burst."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+    def try_take(self, cost, now):
+        """Take cost tokens; returns 0.0 on success, else the seconds until enough tokens exist."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class _Ticket:
+    """Held while a request runs; releases its concurrency slot (if it holds one) exactly once."""
+
+    def __init__(self, controller, holds_slot=True):
+        self._controller = controller
+        self._released = not holds_slot
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class AdmissionController:
+    """
+    Bounded concurrency with a bounded wait queue, plus optional per-client rate limits.
+
+    admit() hands out a ticket when a slot is free, queues the caller while
+    fewer than max_queue requests are waiting, and otherwise rejects
+    immediately with 503. Per-client token buckets (rate_per_second > 0) are
+    charged by cost, for example the number of terms in a batch, and reject with 429.
+    Requests whose work is done elsewhere under a slot of its own (micro-batched
+    terms) can be admitted with hold_slot=False, which charges only the rate limit.
+
+    Event loops use try_admit() instead of admit(): it never blocks, and queues a
+    callback that is handed the ticket when a slot frees up. Queued callbacks are
+    served before blocked admit() callers and share the same max_queue.
+    """
+
+    def __init__(self, max_concurrent, max_queue, queue_timeout_seconds=10.0,
+                 rate_per_second=0.0, burst=0.0):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.rate_per_second = rate_per_second
+        self.burst = burst if burst > 0 else rate_per_second
+        self._cond = threading.Condition()
+        self._callbacks = deque()
+        self._buckets = {}
+        self.active = 0
+        self.waiting = 0
+        self.max_waiting_seen = 0
+        self.admitted = 0
+        self.rejected_rate_limited = 0
+        self.rejected_queue_full = 0
+        self.rejected_queue_timeout = 0
+
+    def _check_rate(self, client_id, cost, now):
+        if self.rate_per_second <= 0 or cost <= 0:
+            return
+        if cost > self.burst:
+            self.rejected_rate_limited += 1
+            raise AdmissionRejected(429, f"Request cost {cost} exceeds the rate-limit burst of {self.burst:g}.",
+                                    cost / self.rate_per_second)
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_CLIENTS:
+                self._prune_buckets(now)
+            bucket = self._buckets[client_id] = TokenBucket(self.rate_per_second, self.burst)
+        wait = bucket.try_take(cost, now)
+        if wait > 0:
+            self.rejected_rate_limited += 1
+            raise AdmissionRejected(429, "Rate limit exceeded.", wait)
+
+    def _prune_buckets(self, now):
+        refill_time = self.burst / self.rate_per_second
+        for client_id in [c for c, b in self._buckets.items() if now - b.updated_at > refill_time]:
+            del self._buckets[client_id]
+
+    def queue_full(self):
+        """Count and return the 503 for a caller turned away because the wait queue is full."""
+        self.rejected_queue_full += 1
+        return AdmissionRejected(503, "Server is overloaded, queue is full.", 1)
+
+    def admit(self, client_id, cost=1, hold_slot=True, timeout=None):
+        """Admit a caller, waiting up to timeout (default queue_timeout_seconds) for a slot."""
+        with self._cond:
+            now = time.monotonic()
+            self._check_rate(client_id, cost, now)
+            if not hold_slot:
+                self.admitted += 1
+                return _Ticket(self, holds_slot=False)
+            if self.active < self.max_concurrent:
+                self.active += 1
+                self.admitted += 1
+                return _Ticket(self)
+            if self.waiting >= self.max_queue:
+                raise self.queue_full()
+
+            self.waiting += 1
+            self.max_waiting_seen = max(self.max_waiting_seen, self.waiting)
+            deadline = now + (self.queue_timeout_seconds if timeout is None else timeout)
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected_queue_timeout += 1
+                        raise AdmissionRejected(503, "Timed out waiting for a free worker.", 1)
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+            return _Ticket(self)
+
+    def try_admit(self, client_id, on_admitted, cost=1, hold_slot=True):
+        """
+        Non-blocking admit: returns a ticket when the caller can run now. Otherwise queues
+        on_admitted and returns None; on_admitted(ticket) is later called from whichever
+        thread frees a slot, and must hand the ticket on without blocking. A caller that
+        stops waiting must call abandon(on_admitted). Raises AdmissionRejected (429/503).
+        """
+        with self._cond:
+            self._check_rate(client_id, cost, time.monotonic())
+            if not hold_slot:
+                self.admitted += 1
+                return _Ticket(self, holds_slot=False)
+            if self.active < self.max_concurrent:
+                self.active += 1
+                self.admitted += 1
+                return _Ticket(self)
+            if self.waiting >= self.max_queue:
+                raise self.queue_full()
+            self._callbacks.append(on_admitted)
+            self.waiting += 1
+            self.max_waiting_seen = max(self.max_waiting_seen, self.waiting)
+            return None
+
+    def abandon(self, on_admitted, timed_out=True):
+        """
+        Withdraw a callback queued by try_admit (timeout or caller gone). Returns False if it
+        had already been handed a ticket, which it then owns and must release.
+        """
+        with self._cond:
+            try:
+                self._callbacks.remove(on_admitted)
+            except ValueError:
+                return False
+            self.waiting -= 1
+            if timed_out:
+                self.rejected_queue_timeout += 1
+            return True
+
+    def _release(self):
+        with self._cond:
+            if not self._callbacks:
+                self.active -= 1
+                self._cond.notify()
+                return
+            # The slot passes straight to the longest-queued callback
+            on_admitted = self._callbacks.popleft()
+            self.waiting -= 1
+            self.admitted += 1
+        on_admitted(_Ticket(self))
+
+    def stats(self):
+        with self._cond:
+            return {
+                "active": self.active,
+                "queue_depth": self.waiting,
+                "max_queue_depth_seen": self.max_waiting_seen,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected_rate_limited": self.rejected_rate_limited,
+                "rejected_queue_full": self.rejected_queue_full,
+                "rejected_queue_timeout": self.rejected_queue_timeout,
+                "rate_limit_per_second": self.rate_per_second,
+                "rate_limit_burst": self.burst,
+                "tracked_clients": len(self._buckets),
+            }
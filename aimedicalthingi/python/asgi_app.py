@@ -0,0 +1,332 @@
+"""
+Asyncio/ASGI serving mode for the medicine API.
+
+Serves the same endpoints as the Flask app from one event loop, so idle
+keep-alive connections cost a socket rather than a worker thread. The
+CPU-bound matching runs in a thread pool. POST /batch_suggest streams one
+NDJSON line per term as soon as it is matched when the client asks for it
+(?stream=1 or Accept: application/x-ndjson).
+
+The admin/debug endpoints (ENABLE_ADMIN_ENDPOINTS=1) run their blocking work on
+the default executor, away from the lookup pool.
+
+Run with: python start_asgi_server.py   (or: uvicorn python.asgi_app:app)
+"""
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+try:
+    from . import medical_autocorrect_api as api
+    from .socket_sidecar import start_socket_sidecar_if_configured
+except ImportError:  # run directly as a script rather than as part of the python package
+    import medical_autocorrect_api as api
+    from socket_sidecar import start_socket_sidecar_if_configured
+
+ASGI_EXECUTOR_WORKERS = int(os.environ.get("ASGI_EXECUTOR_WORKERS", str(min(8, os.cpu_count() or 1))))
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+executor = ThreadPoolExecutor(max_workers=ASGI_EXECUTOR_WORKERS, thread_name_prefix="asgi-lookup")
+
+# Same permissive policy flask_cors applies to the Flask app
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+]
+PREFLIGHT_HEADERS = CORS_HEADERS + [
+    (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+    (b"access-control-allow-headers", b"*"),
+]
+
+
+async def _send_json(send, status, payload, extra_headers=()):
+    body = json.dumps(payload).encode("utf-8")
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode("ascii")),
+    ] + CORS_HEADERS + list(extra_headers)
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_bytes(send, status, body, headers):
+    """Send a non-JSON body; headers is a dict of str header names and values, Content-Type included."""
+    headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+    headers.append((b"content-length", str(len(body)).encode("ascii")))
+    await send({"type": "http.response.start", "status": status, "headers": headers + CORS_HEADERS})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _query_params(scope):
+    """The query string as {name: first value}."""
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return {name: values[0] for name, values in query.items()}
+
+
+async def _send_not_ready(send):
+    status_code, body = api.not_ready_status()
+    extra = [(b"retry-after", str(api.READY_RETRY_AFTER_SECONDS).encode("ascii"))] if status_code == 503 else []
+    await _send_json(send, status_code, body, extra)
+
+
+async def _read_json(receive):
+    """Read the whole request body and decode it; returns None for an empty, oversized or invalid body."""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            break
+    try:
+        data = json.loads(b"".join(chunks) or b"null")
+    except ValueError:
+        return None
+    return data
+
+
+def _requested_dictionary(scope, data):
+    """The "dictionary" named in the JSON body, else in the query string (None for the default)."""
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return data.get("dictionary") or query.get("dictionary", [None])[0]
+
+
+async def _watch_disconnect(receive, disconnected):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            disconnected.set()
+            return
+
+
+async def _send_rejection(send, e):
+    await _send_json(send, e.status_code, {"error": e.reason}, [(b"retry-after", str(e.retry_after).encode("ascii"))])
+
+
+def _hand_over(future, ticket):
+    # Runs on the event loop; a request that stopped waiting releases the slot it was handed
+    if future.done():
+        ticket.release()
+    else:
+        future.set_result(ticket)
+
+
+async def _admit(scope, cost, send, hold_slot=True):
+    """
+    Admit the request or send the 429/503 rejection; returns the ticket or None.
+    Waiting for a slot is an asyncio future woken by the admission controller, so a
+    full queue is detected (and waits time out) on the event loop without tying up threads.
+    """
+    headers = dict(scope.get("headers", []))
+    client_header = headers.get(b"x-client-id", b"").decode("latin-1")
+    remote_addr = (scope.get("client") or ("", 0))[0]
+    client_id = api.client_id_for(client_header, remote_addr)
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def on_admitted(ticket):
+        try:
+            loop.call_soon_threadsafe(_hand_over, future, ticket)
+        except RuntimeError:  # the loop has shut down
+            ticket.release()
+
+    try:
+        ticket = api.admission.try_admit(client_id, on_admitted, cost, hold_slot)
+        if ticket is not None:
+            return ticket
+        try:
+            return await asyncio.wait_for(future, api.admission.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            api.admission.abandon(on_admitted)
+            raise api.AdmissionRejected(503, "Timed out waiting for a free worker.", 1)
+        except asyncio.CancelledError:
+            api.admission.abandon(on_admitted, timed_out=False)
+            raise
+    except api.AdmissionRejected as e:
+        await _send_rejection(send, e)
+        return None
+
+
+async def suggest_medicine(scope, receive, send):
+    if api.sym_spell is None:
+        return await _send_not_ready(send)
+    data = await _read_json(receive)
+    try:
+        input_term = api.request_term(data)
+    except api.InvalidRequest as e:
+        return await _send_json(send, 400, {"error": str(e)})
+    if not input_term:
+        return await _send_json(send, 200, [])
+    requested_dictionary = _requested_dictionary(scope, data)
+    dictionary = api.resolve_dictionary(requested_dictionary)
+    if dictionary is None:
+        return await _send_json(send, 400, api.unknown_dictionary_body(requested_dictionary))
+
+    ticket = await _admit(scope, 1, send, hold_slot=not api.uses_micro_batcher(dictionary))
+    if ticket is None:
+        return
+    loop = asyncio.get_running_loop()
+    try:
+        with ticket:
+            result = await loop.run_in_executor(executor, api.suggest_term, input_term, dictionary)
+    except api.AdmissionRejected as e:
+        return await _send_rejection(send, e)
+    except Exception as e:
+        print(f"An unexpected error occurred during suggestion processing: {e}", file=sys.stderr)
+        return await _send_json(send, 500, {"error": str(e), "message": "Internal server error during suggestion processing."})
+    await _send_json(send, 200, [result] if result else [])
+
+
+async def batch_suggest(scope, receive, send):
+    if api.sym_spell is None:
+        return await _send_not_ready(send)
+    data = await _read_json(receive)
+    try:
+        cleaned_terms = api.request_terms(data)
+    except api.InvalidRequest as e:
+        return await _send_json(send, 400, {"error": str(e)})
+    requested_dictionary = _requested_dictionary(scope, data)
+    dictionary = api.resolve_dictionary(requested_dictionary)
+    if dictionary is None:
+        return await _send_json(send, 400, api.unknown_dictionary_body(requested_dictionary))
+    # Batches are charged one rate-limit token per term
+    ticket = await _admit(scope, len(cleaned_terms), send)
+    if ticket is None:
+        return
+    with ticket:
+        await _batch_suggest_admitted(scope, receive, send, cleaned_terms, dictionary)
+
+
+async def _batch_suggest_admitted(scope, receive, send, cleaned_terms, dictionary):
+    loop = asyncio.get_running_loop()
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    accept = dict(scope.get("headers", [])).get(b"accept", b"").decode("latin-1")
+    if not api.wants_ndjson(query.get("stream", [None])[0], accept):
+        results = await loop.run_in_executor(executor, api.match_medicines, cleaned_terms, dictionary)
+        output = []
+        for term, result in zip(cleaned_terms, results):
+            if isinstance(result, Exception):
+                print(f"An unexpected error occurred while matching '{term}': {result}", file=sys.stderr)
+                result = None
+            output.append(result["term"] if result else "")
+        return await _send_json(send, 200, output)
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", api.NDJSON_MIMETYPE.encode("ascii"))] + CORS_HEADERS,
+    })
+    # Stop matching as soon as the client goes away instead of finishing the whole batch
+    disconnected = asyncio.Event()
+    watcher = asyncio.create_task(_watch_disconnect(receive, disconnected))
+    try:
+        for index, term in enumerate(cleaned_terms):
+            if disconnected.is_set():
+                break
+            result = (await loop.run_in_executor(executor, api.match_medicines, [term], dictionary))[0]
+            line = api.batch_result_line(index, term, result)
+            await send({"type": "http.response.body", "body": line.encode("utf-8"), "more_body": True})
+    finally:
+        watcher.cancel()
+    if not disconnected.is_set():
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+async def liveness_check(scope, receive, send):
+    await _send_json(send, 200, {"status": "alive"})
+
+
+async def readiness_check(scope, receive, send):
+    status_code, body = api.readiness_status()
+    if status_code != 200:
+        retry_after = str(api.READY_RETRY_AFTER_SECONDS).encode("ascii")
+        return await _send_json(send, status_code, body, [(b"retry-after", retry_after)])
+    await _send_json(send, 200, body)
+
+
+async def health_check(scope, receive, send):
+    await _send_json(send, 200, api.health_payload())
+
+
+async def rebuild_hot_tier(scope, receive, send):
+    if not api.ADMIN_ENDPOINTS_ENABLED:
+        return await _send_json(send, 404, {"error": "Not found"})
+    if api.sym_spell is None:
+        return await _send_not_ready(send)
+    loop = asyncio.get_running_loop()
+    await _send_json(send, 200, await loop.run_in_executor(None, api.rebuild_hot_tier))
+
+
+async def debug_memory(scope, receive, send):
+    if not api.ADMIN_ENDPOINTS_ENABLED:
+        return await _send_json(send, 404, {"error": "Not found"})
+    loop = asyncio.get_running_loop()
+    report = await loop.run_in_executor(None, api.memory_report_payload, _query_params(scope).get("include"))
+    await _send_json(send, 200, report)
+
+
+async def debug_profile(scope, receive, send):
+    if not api.ADMIN_ENDPOINTS_ENABLED:
+        return await _send_json(send, 404, {"error": "Not found"})
+    loop = asyncio.get_running_loop()
+    # The profile window blocks for its whole duration: keep it off the lookup pool it is profiling
+    status_code, body, headers = await loop.run_in_executor(None, api.profile_response, _query_params(scope))
+    if isinstance(body, dict):
+        return await _send_json(send, status_code, body)
+    await _send_bytes(send, status_code, body, headers)
+
+
+ROUTES = {
+    ("POST", "/suggest_medicine"): suggest_medicine,
+    ("POST", "/batch_suggest"): batch_suggest,
+    ("GET", "/live"): liveness_check,
+    ("GET", "/ready"): readiness_check,
+    ("GET", "/health"): health_check,
+    ("POST", "/admin/hot_tier/rebuild"): rebuild_hot_tier,
+    ("GET", "/debug/memory"): debug_memory,
+    ("GET", "/debug/profile"): debug_profile,
+}
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            api.start_background_initialization()
+            start_socket_sidecar_if_configured()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+    # Servers run without lifespan events (e.g. uvicorn --lifespan off) still get the dictionary loaded
+    api.start_background_initialization()
+
+    method = scope["method"]
+    path = scope["path"].rstrip("/") or "/"
+    if method == "OPTIONS":
+        await send({"type": "http.response.start", "status": 204, "headers": PREFLIGHT_HEADERS})
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    handler = ROUTES.get((method, path))
+    if handler is None:
+        if any(route_path == path for _, route_path in ROUTES):
+            return await _send_json(send, 405, {"error": "Method not allowed"})
+        return await _send_json(send, 404, {"error": "Not found"})
+    await handler(scope, receive, send)
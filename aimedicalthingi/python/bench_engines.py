@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Side-by-side benchmark of the matching engines in engines.py.
+
+Builds each engine over the lowercased medicine names (edit distance 4, as the
+API does) and reports build time, peak memory allocated while building, the
+deep size of the finished index, and lookup latency for misspelled queries at
+the API's length-dependent edit distance. Top results are compared with the
+first engine's, which should agree.
+
+Usage:
+    python python/bench_engines.py --meds Temp_database/medicines_test.txt --queries 500
+"""
+import argparse
+import gc
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from symspellpy import Verbosity
+
+try:
+    from .engines import ENGINES, create_engine
+    from .memory_introspection import deep_sizeof
+except ImportError:  # run directly as a script rather than as part of the python package
+    from engines import ENGINES, create_engine
+    from memory_introspection import deep_sizeof
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def max_edit_distance_for(query):
+    # Same steps as calculate_max_edit_distance_for_lookup in the API
+    length = len(query)
+    return 1 if length <= 5 else 2 if length <= 8 else 3 if length <= 12 else 4
+
+
+def misspell(name, rng):
+    if len(name) < 4:
+        return name
+    i = rng.randrange(1, len(name))
+    edit = rng.choice(("drop", "double", "swap", "substitute"))
+    if edit == "drop":
+        return name[:i] + name[i + 1:]
+    if edit == "double":
+        return name[:i] + name[i] + name[i:]
+    if edit == "swap":
+        return name[:i - 1] + name[i] + name[i - 1] + name[i + 1:]
+    return name[:i] + rng.choice("aeiouklmnrst") + name[i + 1:]
+
+
+def build(engine_name, names):
+    gc.collect()
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    engine = create_engine(engine_name, max_dictionary_edit_distance=4, prefix_length=7)
+    for name in names:
+        engine.create_dictionary_entry(name, 1)
+    engine.build()
+    build_seconds = time.perf_counter() - started_at
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Name strings are shared with the rest of the process, so only the index itself is counted
+    seen = {id(name) for name in names}
+    index_bytes = sum(deep_sizeof(obj, seen) for _, obj in engine.memory_structures())
+    return engine, build_seconds, peak, index_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare build time, memory and latency of the matching engines.")
+    parser.add_argument("--meds", default=os.path.join(SCRIPT_DIR, "..", "Temp_database", "medicines_test.txt"),
+                        help="medicine list, one name per line")
+    parser.add_argument("--queries", type=int, default=500, help="number of misspelled queries")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="comma-separated engine names")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.meds, "r", encoding="utf-8") as f:
+        names = list(dict.fromkeys(line.strip().lower() for line in f if line.strip()))
+    rng = random.Random(args.seed)
+    queries = [misspell(name, rng) for name in rng.sample(names, min(args.queries, len(names)))]
+    print(f"{len(names)} names, {len(queries)} misspelled queries")
+    print(f"{'engine':<12}{'build s':>9}{'peak MB':>10}{'index MB':>10}{'mean ms':>10}{'p95 ms':>9}{'agree':>8}")
+
+    reference = None
+    for engine_name in args.engines.split(","):
+        engine, build_seconds, peak, index_bytes = build(engine_name, names)
+        latencies, top_terms = [], []
+        for query in queries:
+            started_at = time.perf_counter()
+            suggestions = engine.lookup(query, Verbosity.CLOSEST, max_edit_distance_for(query))
+            latencies.append(time.perf_counter() - started_at)
+            top_terms.append({s.term for s in suggestions if s.distance == suggestions[0].distance} if suggestions else set())
+        if reference is None:
+            reference = top_terms
+        agreement = sum(a == b for a, b in zip(top_terms, reference)) / len(queries)
+        latencies.sort()
+        print(f"{engine_name:<12}{build_seconds:>9.2f}{peak / 2**20:>10.1f}{index_bytes / 2**20:>10.1f}"
+              f"{statistics.mean(latencies) * 1000:>10.3f}{latencies[int(len(latencies) * 0.95) - 1] * 1000:>9.3f}"
+              f"{agreement:>8.1%}")
+        del engine
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
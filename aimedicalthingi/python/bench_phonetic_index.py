@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark the multi-key phonetic candidate index of MedicationMatcher
+(new-attempt-algo.py) against the broad candidate pool it replaces.
+
+Generates misspelled queries from the medication list (one character dropped,
+doubled, swapped or substituted per query) and reports, for each mode,
+candidate-pool size, find_best_match latency and how often the original
+name came back. Also times building the indexes against loading them from
+the persisted cache.
+
+Usage:
+    python python/bench_phonetic_index.py --meds Temp_database/medicines_test.txt --queries 300
+"""
+import argparse
+import importlib.util
+import os
+import random
+import statistics
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_matcher_module():
+    # The module's file name has hyphens, so it cannot be imported by name
+    spec = importlib.util.spec_from_file_location("new_attempt_algo", os.path.join(SCRIPT_DIR, "new-attempt-algo.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def misspell(name, rng):
+    letters = [i for i, c in enumerate(name) if c.isalpha()]
+    if len(letters) < 4:
+        return name
+    i = rng.choice(letters[1:])
+    edit = rng.choice(("drop", "double", "swap", "substitute"))
+    if edit == "drop":
+        return name[:i] + name[i + 1:]
+    if edit == "double":
+        return name[:i] + name[i] + name[i:]
+    if edit == "swap" and i + 1 < len(name):
+        return name[:i - 1] + name[i] + name[i - 1] + name[i + 1:]
+    return name[:i] + rng.choice("aeiouklmnrst") + name[i + 1:]
+
+
+def measure(matcher, queries, use_phonetic_index):
+    matcher.use_phonetic_index = use_phonetic_index
+    pool_sizes, latencies, recovered = [], [], 0
+    for original, query in queries:
+        pool_sizes.append(len(matcher._get_candidate_pool(matcher._preprocess_input(query))))
+        started_at = time.perf_counter()
+        result = matcher.find_best_match(query)
+        latencies.append(time.perf_counter() - started_at)
+        recovered += result == original
+    latencies.sort()
+    return {
+        "pool_mean": statistics.mean(pool_sizes),
+        "pool_median": statistics.median(pool_sizes),
+        "latency_mean_ms": statistics.mean(latencies) * 1000,
+        "latency_p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "recovered": recovered / len(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phonetic index vs. broad candidate pool for MedicationMatcher.")
+    parser.add_argument("--meds", default=os.path.join(SCRIPT_DIR, "..", "Temp_database", "medicines_test.txt"),
+                        help="medication list, one name per line")
+    parser.add_argument("--queries", type=int, default=300, help="number of misspelled queries")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    module = load_matcher_module()
+    started_at = time.perf_counter()
+    module.MedicationMatcher(args.meds, cache_indexes=False)
+    build_seconds = time.perf_counter() - started_at
+    module.MedicationMatcher(args.meds)  # writes the cache if it is missing or stale
+    started_at = time.perf_counter()
+    matcher = module.MedicationMatcher(args.meds)
+    cached_seconds = time.perf_counter() - started_at
+
+    rng = random.Random(args.seed)
+    names = rng.sample(matcher.original_medications, min(args.queries, len(matcher.original_medications)))
+    queries = [(name, misspell(name, rng)) for name in names]
+
+    print(f"{len(matcher.medications)} medications, {len(queries)} misspelled queries")
+    print(f"Index build {build_seconds:.2f}s, load from cache {cached_seconds:.2f}s, "
+          f"{len(matcher.phonetic_index)} phonetic keys")
+    print(f"{'':<16}{'pool mean':>10}{'pool median':>13}{'mean ms':>10}{'p95 ms':>10}{'recovered':>11}")
+    for label, use_phonetic_index in (("broad pool", False), ("phonetic index", True)):
+        stats = measure(matcher, queries, use_phonetic_index)
+        print(f"{label:<16}{stats['pool_mean']:>10.0f}{stats['pool_median']:>13.0f}"
+              f"{stats['latency_mean_ms']:>10.2f}{stats['latency_p95_ms']:>10.2f}{stats['recovered']:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Unix socket sidecar against the HTTP endpoints in one process.
+
+Loads the dictionary, serves the Flask app on a free local port and the
+sidecar on a temporary socket, then times the same terms through:
+HTTP /suggest_medicine one at a time (keep-alive), HTTP /batch_suggest,
+sidecar suggest one at a time, sidecar suggest pipelined and sidecar batch.
+The result cache is warmed with every term first, so the numbers compare
+transport and protocol overhead rather than SymSpell.
+
+Usage:
+    TEST_MODE=1 python python/bench_socket_vs_http.py --terms 2000
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+try:
+    from . import medical_autocorrect_api as api
+    from .socket_client import MedicineSocketClient
+    from .socket_sidecar import start_socket_sidecar
+except ImportError:  # run directly as a script rather than as part of the python package
+    import medical_autocorrect_api as api
+    from socket_client import MedicineSocketClient
+    from socket_sidecar import start_socket_sidecar
+
+
+def sample_terms(count, seed=0):
+    """Dictionary names with one character dropped, like typical OCR noise."""
+    rng = random.Random(seed)
+    names = api.load_medicine_names(api.MEDS_FILE_PATH)
+    terms = []
+    for name in rng.sample(names, min(count, len(names))):
+        position = rng.randrange(len(name))
+        terms.append(name[:position] + name[position + 1:] if len(name) > 4 else name)
+    return terms
+
+
+def http_single(port, terms):
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    headers = {"Content-Type": "application/json"}
+    for term in terms:
+        connection.request("POST", "/suggest_medicine", json.dumps({"term": term}), headers)
+        connection.getresponse().read()
+    connection.close()
+
+
+def http_batch(port, terms, batch_size):
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    headers = {"Content-Type": "application/json"}
+    for start in range(0, len(terms), batch_size):
+        body = json.dumps({"terms": terms[start:start + batch_size]})
+        connection.request("POST", "/batch_suggest", body, headers)
+        connection.getresponse().read()
+    connection.close()
+
+
+def socket_single(path, terms):
+    with MedicineSocketClient(path) as client:
+        for term in terms:
+            client.suggest(term)
+
+
+def socket_pipelined(path, terms, window):
+    with MedicineSocketClient(path) as client:
+        client.suggest_many(terms, window=window)
+
+
+def socket_batch(path, terms, batch_size):
+    with MedicineSocketClient(path) as client:
+        for start in range(0, len(terms), batch_size):
+            client.batch(terms[start:start + batch_size])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Unix socket sidecar with the HTTP API.")
+    parser.add_argument("--terms", type=int, default=2000, help="number of terms to send")
+    parser.add_argument("--batch-size", type=int, default=64, help="terms per batch request")
+    parser.add_argument("--window", type=int, default=64, help="pipelined requests in flight")
+    args = parser.parse_args()
+
+    report = sys.stdout
+    # The matching core logs every lookup; keep the report readable
+    sys.stdout = open(os.devnull, "w")
+    if not api.initialize_symspell():
+        print(f"Could not load {api.MEDS_FILE_PATH}", file=report)
+        sys.exit(1)
+    api.query_log = None
+    # Measure the transports, not the admission limits
+    api.admission.max_concurrent = max(api.admission.max_concurrent, 64)
+    terms = sample_terms(args.terms)
+    api.match_medicines(terms)
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    http_server = make_server("127.0.0.1", 0, api.app, threaded=True)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    socket_path = os.path.join(tempfile.mkdtemp(), "medcipher.sock")
+    socket_server = start_socket_sidecar(socket_path)
+
+    runs = [
+        ("HTTP /suggest_medicine", lambda: http_single(http_server.port, terms)),
+        (f"HTTP /batch_suggest ({args.batch_size}/request)", lambda: http_batch(http_server.port, terms, args.batch_size)),
+        ("socket suggest", lambda: socket_single(socket_path, terms)),
+        (f"socket suggest, pipelined ({args.window} in flight)", lambda: socket_pipelined(socket_path, terms, args.window)),
+        (f"socket batch ({args.batch_size}/request)", lambda: socket_batch(socket_path, terms, args.batch_size)),
+    ]
+    print(f"{len(terms)} terms, warm result cache, dictionary {api.MEDS_FILE_PATH}", file=report)
+    for label, run in runs:
+        started_at = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started_at
+        print(f"  {label:<45} {len(terms) / elapsed:>10.0f} terms/s  "
+              f"{elapsed / len(terms) * 1e6:>8.1f} µs/term", file=report)
+
+    http_server.shutdown()
+    socket_server.shutdown()
+    socket_server.server_close()
+    os.remove(socket_path)
+
+
+if __name__ == "__main__":
+    main()
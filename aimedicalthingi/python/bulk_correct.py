@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Offline bulk correction of medicine names with a process pool.
+
+Runs every line of an input file (one medicine name per line) through the
+same matching core as /suggest_medicine and writes a TSV of
+input, matched term, confidence and method, in input order.
+
+The dictionary is built once and pickled to a snapshot; each worker process
+restores the snapshot instead of rebuilding the index (with the fork start
+method, workers simply inherit the parent's copy). The snapshot records the
+settings and source file versions it was built from and is rebuilt when they
+change. Work is cut into chunks, and after every chunk written the output
+offset is recorded in OUTPUT.checkpoint, so an interrupted job resumes where it
+stopped; a checkpoint is only resumed with the same input file and dictionary
+configuration.
+
+Usage:
+    python bulk_correct.py prescriptions.txt corrected.tsv --workers 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+try:
+    from . import medical_autocorrect_api as api
+except ImportError:  # run directly as a script rather than as part of the python package
+    import medical_autocorrect_api as api
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def default_snapshot_path():
+    # One snapshot per matching engine and set of dictionaries, since each pickles a different index
+    spec = ",".join(f"{dictionary}={os.path.abspath(path)}" for dictionary, path in api.MEDICINE_DICTIONARIES)
+    digest = hashlib.sha1(spec.encode("utf-8")).hexdigest()[:12]
+    return api.MEDICINE_DICTIONARIES[0][1] + f".{api.MATCHING_ENGINE}.{digest}.snapshot.pickle"
+
+
+def ensure_snapshot(snapshot_path):
+    """
+    Build the dictionary snapshot unless one built from the current settings
+    and source files (every MEDICINE_DICTIONARIES file, usage counts) already exists.
+    """
+    if api.read_snapshot_fingerprint(snapshot_path) == api.snapshot_fingerprint():
+        print(f"Using existing dictionary snapshot {snapshot_path}")
+        return
+    if os.path.exists(snapshot_path):
+        print(f"Dictionary snapshot {snapshot_path} is stale, rebuilding it")
+    if api.sym_spell is None and not api.initialize_symspell():
+        raise RuntimeError(f"Could not load medicine dictionaries {api.MEDICINE_DICTIONARIES}")
+    api.save_snapshot(snapshot_path)
+
+
+def _init_worker(snapshot_path):
+    # Per-term diagnostics from the matching core would flood the console
+    sys.stdout = open(os.devnull, "w")
+    # Offline jobs must not flood (or race on) the serving query log
+    api.query_log = None
+    if api.sym_spell is None:
+        api.load_snapshot(snapshot_path)
+
+
+def correct_chunk(terms):
+    """Correct one chunk of names; returns the TSV text for the chunk."""
+    lines = []
+    for term, result in zip(terms, api.match_medicines(terms)):
+        if isinstance(result, Exception) or not result:
+            lines.append(f"{term}\t\t0.0\tno_match_found\n")
+        else:
+            lines.append(f"{term}\t{result['term']}\t{result['confidence']}\t{result['method']}\n")
+    return "".join(lines)
+
+
+def _run_key(input_path):
+    """What a checkpoint's rows were produced from: the input file as it was, and the dictionary configuration."""
+    st = os.stat(input_path)
+    key = {
+        "input": os.path.abspath(input_path),
+        "input_version": [st.st_mtime_ns, st.st_size],
+        "dictionary": api.snapshot_fingerprint(),
+    }
+    # Compared with a key read back from JSON, so normalize it the same way
+    return json.loads(json.dumps(key))
+
+
+def _read_checkpoint(checkpoint_path, run_key):
+    if not os.path.exists(checkpoint_path):
+        return 0, 0
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("input") != run_key["input"]:
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to a different input file")
+    if checkpoint.get("input_version") != run_key["input_version"]:
+        raise ValueError(f"{run_key['input']} changed since checkpoint {checkpoint_path} was written; "
+                         f"rerun with --restart")
+    if checkpoint.get("dictionary") != run_key["dictionary"]:
+        raise ValueError(f"The dictionary settings or files changed since checkpoint {checkpoint_path} "
+                         f"was written; rerun with --restart")
+    return checkpoint["lines_done"], checkpoint["output_bytes"]
+
+
+def _write_checkpoint(checkpoint_path, run_key, lines_done, output_bytes):
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(run_key, lines_done=lines_done, output_bytes=output_bytes), f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def _iter_chunks(input_path, skip_lines, chunk_size):
+    with open(input_path, "r", encoding="utf-8") as f:
+        lines = (line.rstrip("\r\n").replace("\t", " ").strip() for line in islice(f, skip_lines, None))
+        while True:
+            chunk = list(islice(lines, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+def bulk_correct(input_path, output_path, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 snapshot_path=None, resume=True):
+    """
+    Correct every line of input_path into output_path with a pool of worker processes.
+    Returns a dict of run statistics.
+    """
+    workers = workers or os.cpu_count() or 1
+    snapshot_path = snapshot_path or default_snapshot_path()
+    checkpoint_path = output_path + ".checkpoint"
+
+    run_key = _run_key(input_path)
+    lines_done, output_bytes = _read_checkpoint(checkpoint_path, run_key) if resume else (0, 0)
+    if lines_done:
+        existing_bytes = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+        if existing_bytes < output_bytes:
+            raise ValueError(f"Checkpoint {checkpoint_path} expects {output_bytes} bytes of output, but "
+                             f"{output_path} has {existing_bytes}; rerun with --restart")
+        print(f"Resuming after {lines_done} lines ({output_bytes} bytes of output)")
+
+    ensure_snapshot(snapshot_path)
+
+    started_at = time.time()
+    processed = 0
+    with open(output_path, "r+b" if lines_done else "wb") as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(snapshot_path,)) as pool:
+        out.seek(output_bytes)
+        out.truncate()
+        # Keep a bounded window of chunks in flight and write them back in input order
+        pending = []
+        chunks = _iter_chunks(input_path, lines_done, chunk_size)
+        for chunk in chunks:
+            pending.append((len(chunk), pool.submit(correct_chunk, chunk)))
+            if len(pending) < workers * 2:
+                continue
+            size, future = pending.pop(0)
+            lines_done, output_bytes = _flush_chunk(out, future, size, lines_done, checkpoint_path, run_key)
+            processed += size
+        for size, future in pending:
+            lines_done, output_bytes = _flush_chunk(out, future, size, lines_done, checkpoint_path, run_key)
+            processed += size
+
+    elapsed = time.time() - started_at
+    stats = {
+        "lines_processed": processed,
+        "lines_total": lines_done,
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 2),
+        "lines_per_second": round(processed / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    os.remove(checkpoint_path)
+    print(f"✅ Corrected {processed} names in {elapsed:.1f}s "
+          f"({stats['lines_per_second']} names/s with {workers} workers) -> {output_path}")
+    return stats
+
+
+def _flush_chunk(out, future, size, lines_done, checkpoint_path, run_key):
+    out.write(future.result().encode("utf-8"))
+    out.flush()
+    os.fsync(out.fileno())
+    lines_done += size
+    output_bytes = out.tell()
+    _write_checkpoint(checkpoint_path, run_key, lines_done, output_bytes)
+    return lines_done, output_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-correct medicine names with a process pool.")
+    parser.add_argument("input", help="text file with one medicine name per line")
+    parser.add_argument("output", help="TSV output: input, match, confidence, method")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="names per work unit")
+    parser.add_argument("--snapshot", default=None, help="dictionary snapshot path (built if missing or stale)")
+    parser.add_argument("--restart", action="store_true", help="ignore any checkpoint and start from the top")
+    args = parser.parse_args()
+
+    bulk_correct(args.input, args.output, workers=args.workers, chunk_size=args.chunk_size,
+                 snapshot_path=args.snapshot, resume=not args.restart)
+
+
+if __name__ == "__main__":
+    main()
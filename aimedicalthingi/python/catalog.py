@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Columnar medicine catalog: the medicine list pre-parsed into NumPy columns.
+
+A catalog is a directory of .npy files plus manifest.json. Every column
+can be memory-mapped, so consumers filter on base name, strength, unit or
+form without re-parsing the names. Layout (n = number of medicines):
+
+    id.npy                       int32[n]
+    name.data.npy / .offsets     original names, UTF-8 bytes + int64[n + 1] offsets
+    normalized.data.npy / ...    lowercased, whitespace-collapsed names
+    base_id.npy                  int32[n], row in the sorted base-name table
+    base_names.data.npy / ...    distinct base names, sorted
+    form.npy                     int8[n], code into manifest "forms" (-1 = none)
+    strengths.values.npy         float64[m], all strengths back to back
+    strengths.units.npy          int8[m], code into manifest "units"
+    strengths.offsets.npy        int64[n + 1], row i owns values[offsets[i]:offsets[i + 1]]
+
+Usage:
+    python catalog.py medicines_V3.txt medicines_V3.catalog
+"""
+import json
+import os
+import sys
+from bisect import bisect_left
+
+import numpy as np
+
+try:
+    from .medicine_records import MedicineRecord, parse_medicine_name
+except ImportError:  # run directly as a script rather than as part of the python package
+    from medicine_records import MedicineRecord, parse_medicine_name
+
+CATALOG_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+def _save_strings(directory, column, strings):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(os.path.join(directory, f"{column}.data.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(os.path.join(directory, f"{column}.offsets.npy"), offsets)
+
+
+def write_catalog(names, directory):
+    """
+    Parse medicine names and write them as a columnar catalog into directory.
+    Names are de-duplicated case-insensitively, keeping the first spelling seen.
+    Returns the number of rows written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    seen = set()
+    records = []
+    for name in names:
+        name = name.strip().lstrip("﻿")
+        normalized = " ".join(name.lower().split())
+        if not name or normalized in seen:
+            continue
+        seen.add(normalized)
+        records.append(parse_medicine_name(name))
+
+    base_names = sorted({r.base_name for r in records})
+    base_ids = {base: i for i, base in enumerate(base_names)}
+    forms = sorted({r.form for r in records if r.form})
+    form_codes = {form: i for i, form in enumerate(forms)}
+    units = sorted({unit for r in records for unit in r.units})
+    unit_codes = {unit: i for i, unit in enumerate(units)}
+
+    n = len(records)
+    strength_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(r.strengths) for r in records], out=strength_offsets[1:])
+
+    np.save(os.path.join(directory, "id.npy"), np.arange(n, dtype=np.int32))
+    _save_strings(directory, "name", [r.name for r in records])
+    _save_strings(directory, "normalized", [" ".join(r.name.lower().split()) for r in records])
+    _save_strings(directory, "base_names", base_names)
+    np.save(os.path.join(directory, "base_id.npy"), np.array([base_ids[r.base_name] for r in records], dtype=np.int32))
+    np.save(os.path.join(directory, "form.npy"),
+            np.array([form_codes[r.form] if r.form else -1 for r in records], dtype=np.int8))
+    np.save(os.path.join(directory, "strengths.values.npy"),
+            np.array([s for r in records for s in r.strengths], dtype=np.float64))
+    np.save(os.path.join(directory, "strengths.units.npy"),
+            np.array([unit_codes[u] for r in records for u in r.units], dtype=np.int8))
+    np.save(os.path.join(directory, "strengths.offsets.npy"), strength_offsets)
+
+    with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": CATALOG_VERSION,
+            "rows": n,
+            "base_names": len(base_names),
+            "forms": forms,
+            "units": units,
+        }, f, indent=2)
+    print(f"Wrote catalog with {n} medicines ({len(base_names)} base names) to {directory}")
+    return n
+
+
+class _StringColumn:
+    """Read-only view of a memory-mapped string column."""
+
+    def __init__(self, directory, column):
+        self.data = np.load(os.path.join(directory, f"{column}.data.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(directory, f"{column}.offsets.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def to_list(self):
+        """Decode the whole column at once (much faster than indexing row by row)."""
+        data = bytes(self.data)
+        offsets = self.offsets.tolist()
+        return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(self))]
+
+
+class MedicineCatalog:
+    """
+    Memory-mapped catalog written by write_catalog.
+
+    mask() builds a boolean row mask from column filters; names(), records()
+    and rows() turn row indices back into values.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != CATALOG_VERSION:
+            raise ValueError(f"Unsupported catalog version {self.manifest.get('version')} in {directory}")
+        self.directory = directory
+        self.forms = self.manifest["forms"]
+        self.units = self.manifest["units"]
+
+        def load(name):
+            return np.load(os.path.join(directory, name), mmap_mode="r")
+
+        self.ids = load("id.npy")
+        self.base_id = load("base_id.npy")
+        self.form = load("form.npy")
+        self.strength_values = load("strengths.values.npy")
+        self.strength_units = load("strengths.units.npy")
+        self.strength_offsets = load("strengths.offsets.npy")
+        self.name = _StringColumn(directory, "name")
+        self.normalized = _StringColumn(directory, "normalized")
+        self.base_names = _StringColumn(directory, "base_names")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def base_id_of(self, base_name):
+        """Row of base_name in the sorted base-name table, or -1 (binary search over the mmap)."""
+        lo = bisect_left(range(len(self.base_names)), base_name, key=lambda i: self.base_names[i])
+        if lo < len(self.base_names) and self.base_names[lo] == base_name:
+            return lo
+        return -1
+
+    def _rows_with_strength(self, value_mask):
+        """Rows owning at least one strength value selected by value_mask."""
+        hit_positions = np.flatnonzero(value_mask)
+        rows = np.searchsorted(self.strength_offsets, hit_positions, side="right") - 1
+        row_mask = np.zeros(len(self), dtype=bool)
+        row_mask[rows] = True
+        return row_mask
+
+    def mask(self, base_name=None, form=None, unit=None, strength=None, min_strength=None, max_strength=None):
+        """Boolean mask of rows matching every given filter (strength filters apply per strength value)."""
+        row_mask = np.ones(len(self), dtype=bool)
+        if base_name is not None:
+            row_mask &= self.base_id == self.base_id_of(base_name.lower())
+        if form is not None:
+            code = self.forms.index(form.lower()) if form.lower() in self.forms else -2
+            row_mask &= self.form == code
+        if unit is not None or strength is not None or min_strength is not None or max_strength is not None:
+            value_mask = np.ones(len(self.strength_values), dtype=bool)
+            if unit is not None:
+                code = self.units.index(unit.lower()) if unit.lower() in self.units else -2
+                value_mask &= self.strength_units == code
+            if strength is not None:
+                value_mask &= self.strength_values == strength
+            if min_strength is not None:
+                value_mask &= self.strength_values >= min_strength
+            if max_strength is not None:
+                value_mask &= self.strength_values <= max_strength
+            row_mask &= self._rows_with_strength(value_mask)
+        return row_mask
+
+    def rows(self, mask):
+        return np.flatnonzero(mask)
+
+    def names(self, rows):
+        return [self.name[i] for i in rows]
+
+    def record(self, i):
+        start, end = self.strength_offsets[i], self.strength_offsets[i + 1]
+        form_code = int(self.form[i])
+        return MedicineRecord(
+            self.name[i],
+            self.base_names[int(self.base_id[i])],
+            tuple(float(v) for v in self.strength_values[start:end]),
+            tuple(self.units[int(u)] for u in self.strength_units[start:end]),
+            self.forms[form_code] if form_code >= 0 else None,
+        )
+
+    def records(self, rows=None):
+        for i in (range(len(self)) if rows is None else rows):
+            yield self.record(i)
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python catalog.py <medicines.txt> <catalog directory>")
+        sys.exit(1)
+    input_file, directory = sys.argv[1], sys.argv[2]
+    with open(input_file, "r", encoding="utf-8") as f:
+        write_catalog(f, directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import threading
+import time
+from concurrent.futures import Future
+
+
+class _Call:
+    """One in-flight computation that followers can wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single computation.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is still running (followers) block and receive the same
+    result, or the same exception. Nothing is remembered once the call
+    finishes, so this sits underneath any result cache rather than replacing it.
+    Shared results must be treated as read-only by callers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                is_leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                is_leader = True
+
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._calls)
+        total = self.leaders + self.coalesced
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": in_flight,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+        }
+
+
+class QueueFull(Exception):
+    """Raised by MicroBatcher.submit when max_queue items are already waiting."""
+
+
+class MicroBatcher:
+    """
+    Gather concurrent single-item calls into small batches for one batched pass.
+
+    submit() blocks the calling thread until its item has been processed.
+    A single worker thread drains the queue and calls process_batch(items),
+    which must return one result per item; an Exception instance in the
+    result list is raised in the matching caller only, and anything
+    process_batch itself raises is raised in every caller of that batch.
+
+    The gathering window adapts to load. The worker tracks the arrival rate,
+    and when fewer than one extra item would arrive within max_window_ms it
+    dispatches immediately, so latency stays flat at low QPS. Under load it
+    waits just long enough to fill max_batch_size, capped at max_window_ms.
+
+    With max_queue set, submit() raises QueueFull instead of queueing once that
+    many items are waiting. While a batch is processed, dispatching_since holds
+    the arrival time (time.monotonic()) of its oldest item.
+    """
+
+    def __init__(self, process_batch, max_batch_size=32, max_window_ms=5.0,
+                 name="micro-batcher", smoothing=0.2, max_queue=None):
+        self._process_batch = process_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_queue = max_queue
+        self.max_window_s = max(0.0, max_window_ms / 1000.0)
+        self._name = name
+        self._smoothing = smoothing
+        self._cond = threading.Condition()
+        self._queue = []
+        self._worker = None
+        self._last_arrival = None
+        self._mean_interarrival = None
+        self.current_window_s = 0.0
+        self.dispatching_since = None
+        self.rejected = 0
+        self.batches = 0
+        self.items = 0
+        self.max_observed_batch = 0
+
+    def submit(self, item):
+        future = Future()
+        with self._cond:
+            if self.max_queue is not None and len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(f"{len(self._queue)} items already waiting")
+            self._ensure_worker()
+            now = time.monotonic()
+            if self._last_arrival is not None:
+                gap = now - self._last_arrival
+                # A gap longer than the window means load dropped: forget the old rate at once
+                if self._mean_interarrival is None or gap > self.max_window_s:
+                    self._mean_interarrival = gap
+                else:
+                    self._mean_interarrival += self._smoothing * (gap - self._mean_interarrival)
+            self._last_arrival = now
+            self._queue.append((now, item, future))
+            self._cond.notify()
+        return future.result()
+
+    def _ensure_worker(self):
+        # A worker that died (it should not) is replaced, so callers never wait on a dead queue
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._worker.start()
+
+    def _adapt_window(self):
+        if self._mean_interarrival is None:
+            return 0.0
+        if self._mean_interarrival <= 0:
+            return self.max_window_s
+        arrival_rate = 1.0 / self._mean_interarrival
+        if arrival_rate * self.max_window_s < 1.0:
+            return 0.0
+        return min(self.max_window_s, self.max_batch_size / arrival_rate)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                self.current_window_s = self._adapt_window()
+                deadline = self._queue[0][0] + self.current_window_s
+                while len(self._queue) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._queue[:self.max_batch_size]
+                del self._queue[:self.max_batch_size]
+
+            self.batches += 1
+            self.items += len(batch)
+            self.max_observed_batch = max(self.max_observed_batch, len(batch))
+            self.dispatching_since = batch[0][0]
+            try:
+                results = list(self._process_batch([item for _, item, _ in batch]))
+                if len(results) != len(batch):
+                    raise RuntimeError(f"process_batch returned {len(results)} results for {len(batch)} items")
+            except BaseException as e:
+                # Whatever the batch raises fails its callers, never the worker
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def stats(self):
+        with self._cond:
+            queued = len(self._queue)
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size_seen": self.max_observed_batch,
+            "queued": queued,
+            "current_window_ms": round(self.current_window_s * 1000, 3),
+            "max_window_ms": self.max_window_s * 1000,
+            "max_batch_size": self.max_batch_size,
+            "max_queue": self.max_queue,
+            "rejected_queue_full": self.rejected,
+        }
@@ -0,0 +1,109 @@
+import os
+
+
+def parse_dictionary_spec(spec):
+    """
+    Parse "name=path,name=path" into [(name, absolute path), ...] in the given order.
+    An empty or missing spec gives an empty list.
+    """
+    dictionaries = []
+    for entry in (spec or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, separator, path = entry.partition("=")
+        name, path = name.strip(), path.strip()
+        if not separator or not name or not path:
+            raise ValueError(f"Bad dictionary entry {entry!r}, expected name=path")
+        if name in dict(dictionaries):
+            raise ValueError(f"Dictionary {name!r} is listed twice")
+        dictionaries.append((name, os.path.abspath(path)))
+    return dictionaries
+
+
+class DictionaryRegistry:
+    """
+    Several named medicine dictionaries over one shared string table.
+
+    Every distinct lowercased name gets one ID, and each dictionary is a bitset
+    over those IDs, so a name listed in three formularies is stored once plus
+    three bits. The matching structures (SymSpell indexes, full_med_map, dosage
+    index) are built once over the union; lookups for a dictionary keep only
+    the candidates whose bit is set in it.
+    """
+
+    def __init__(self, files):
+        # Dictionary name -> source file, in configuration order (the first is the default)
+        self.files = dict(files)
+        self.ids = {}
+        self._bits = {name: bytearray() for name in self.files}
+        self.sizes = {name: 0 for name in self.files}
+        self.shared_sizes = {name: 0 for name in self.files}
+        self.requests = {name: 0 for name in self.files}
+
+    @property
+    def default(self):
+        return next(iter(self.files))
+
+    def add(self, dictionary, name):
+        """Add a lowercased name to a dictionary; returns its ID in the shared table."""
+        name_id = self.ids.setdefault(name, len(self.ids))
+        bits = self._bits[dictionary]
+        byte_index = name_id >> 3
+        if byte_index >= len(bits):
+            bits.extend(bytes(byte_index + 1 - len(bits)))
+        mask = 1 << (name_id & 7)
+        if not bits[byte_index] & mask:
+            bits[byte_index] |= mask
+            self.sizes[dictionary] += 1
+        return name_id
+
+    def contains(self, dictionary, name):
+        name_id = self.ids.get(name)
+        if name_id is None:
+            return False
+        bits = self._bits[dictionary]
+        byte_index = name_id >> 3
+        return byte_index < len(bits) and bool(bits[byte_index] & (1 << (name_id & 7)))
+
+    def finish(self):
+        """Count, per dictionary, the entries it shares with at least one other dictionary."""
+        if len(self.files) < 2:
+            return
+        for dictionary, bits in self._bits.items():
+            others = [other for name, other in self._bits.items() if name != dictionary]
+            shared = 0
+            for byte_index, byte in enumerate(bits):
+                if not byte:
+                    continue
+                union = 0
+                for other in others:
+                    if byte_index < len(other):
+                        union |= other[byte_index]
+                shared += bin(byte & union).count("1")
+            self.shared_sizes[dictionary] = shared
+
+    def member_filter(self, dictionary):
+        """
+        Predicate telling whether a lowercased name belongs to the dictionary, or None
+        when the dictionary holds every name in the table and no filtering is needed.
+        """
+        if self.sizes[dictionary] == len(self.ids):
+            return None
+        return lambda name: self.contains(dictionary, name)
+
+    def stats(self):
+        return {
+            "string_table_entries": len(self.ids),
+            "default": self.default,
+            "dictionaries": {
+                name: {
+                    "file": self.files[name],
+                    "entries": self.sizes[name],
+                    "shared_entries": self.shared_sizes[name],
+                    "bitset_bytes": len(self._bits[name]),
+                    "terms_requested": self.requests[name],
+                }
+                for name in self.files
+            },
+        }
@@ -0,0 +1,177 @@
+import os
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+
+from symspellpy import SymSpell, Verbosity
+from symspellpy.suggest_item import SuggestItem
+
+# Fuzzy-matching backend for the cold index, the hot tier and the dosage base-name index:
+# "symspell" (precomputed deletes, fastest lookups) or "automaton" (sorted array, far less memory)
+MATCHING_ENGINE = os.environ.get("MATCHING_ENGINE", "symspell")
+
+
+class MatchingEngine(ABC):
+    """
+    Interface of a fuzzy dictionary: add terms with counts, build once, then look up.
+
+    lookup() follows SymSpell's contract: SuggestItems within max_edit_distance
+    (optimal string alignment distance) ordered by distance, then count, with
+    Verbosity.TOP returning the best one, CLOSEST every term at the smallest
+    distance found and ALL every term within range.
+    """
+
+    name = None
+
+    @abstractmethod
+    def create_dictionary_entry(self, term, count):
+        """Add count to term, creating it if needed."""
+
+    def build(self):
+        """Finish the index after the last create_dictionary_entry; must be called before lookup."""
+
+    @abstractmethod
+    def lookup(self, term, verbosity, max_edit_distance):
+        """SuggestItems for term, as described above."""
+
+    @abstractmethod
+    def __len__(self):
+        """Number of distinct terms added."""
+
+    def memory_structures(self):
+        """(name, object) pairs holding the engine's data, for /debug/memory."""
+        return []
+
+
+class SymSpellEngine(MatchingEngine):
+    """symspellpy's symmetric-delete index: fastest lookups, memory grows steeply with the edit distance."""
+
+    name = "symspell"
+
+    def __init__(self, max_dictionary_edit_distance=4, prefix_length=7):
+        self.sym_spell = SymSpell(max_dictionary_edit_distance=max_dictionary_edit_distance,
+                                  prefix_length=prefix_length)
+
+    def create_dictionary_entry(self, term, count):
+        self.sym_spell.create_dictionary_entry(term, count)
+
+    def lookup(self, term, verbosity, max_edit_distance):
+        return self.sym_spell.lookup(term, verbosity, max_edit_distance=max_edit_distance, transfer_casing=False)
+
+    def __len__(self):
+        return len(self.sym_spell.words)
+
+    def memory_structures(self):
+        return [("symspell_deletes", self.sym_spell._deletes), ("symspell_words", self.sym_spell._words)]
+
+
+class SortedAutomatonEngine(MatchingEngine):
+    """
+    Terms in one sorted list with a parallel array of counts, searched as an implicit trie.
+
+    A lookup walks the trie depth first: the terms sharing a prefix are a contiguous
+    range of the sorted list (found with bisect), and each prefix extends the
+    edit-distance row of its parent by one character, like stepping a Levenshtein
+    automaton. A branch is dropped as soon as every cell of its row exceeds the
+    allowed distance. Nothing but the terms and counts is stored.
+    """
+
+    name = "automaton"
+
+    def __init__(self, max_dictionary_edit_distance=4, prefix_length=None):
+        self.max_dictionary_edit_distance = max_dictionary_edit_distance
+        self._pending = {}
+        self.terms = []
+        self.counts = array("L")
+
+    def create_dictionary_entry(self, term, count):
+        self._pending[term] = self._pending.get(term, 0) + count
+
+    def build(self):
+        if self._pending:
+            merged = dict(zip(self.terms, self.counts))
+            for term, count in self._pending.items():
+                merged[term] = merged.get(term, 0) + count
+            self.terms = sorted(merged)
+            self.counts = array("L", (merged[term] for term in self.terms))
+            self._pending = {}
+
+    def __len__(self):
+        return len(self.terms) + len(self._pending)
+
+    def memory_structures(self):
+        return [("automaton_terms", self.terms), ("automaton_counts", self.counts)]
+
+    def lookup(self, term, verbosity, max_edit_distance):
+        if max_edit_distance > self.max_dictionary_edit_distance:
+            raise ValueError("distance too large")
+        terms = self.terms
+        if not terms:
+            return []
+        # A term found in the dictionary is the only CLOSEST/TOP answer, as in SymSpell
+        if verbosity != Verbosity.ALL:
+            position = bisect_left(terms, term)
+            if position < len(terms) and terms[position] == term:
+                return [SuggestItem(term, 0, self.counts[position])]
+            # Typos are mostly one or two edits: widen the search one edit at a time
+            limits = range(1, max_edit_distance + 1)
+        else:
+            limits = [max_edit_distance]
+
+        found = []
+        for limit in limits:
+            first_row = [j if j <= limit else limit + 1 for j in range(len(term) + 1)]
+            self._search(term, "", 0, len(terms), first_row, None, "", limit, found)
+            if found:
+                break
+        found = [SuggestItem(terms[i], distance, self.counts[i]) for i, distance in found]
+        found.sort()
+        if verbosity == Verbosity.TOP:
+            return found[:1]
+        return found
+
+    def _search(self, query, prefix, lo, hi, row, previous_row, previous_char, limit, found):
+        terms = self.terms
+        depth = len(prefix)
+        # The prefix itself is a term: it sorts first in its range
+        if terms[lo] == prefix:
+            if row[-1] <= limit:
+                found.append((lo, row[-1]))
+            lo += 1
+
+        query_length = len(query)
+        # Cells further than limit from the diagonal can never come back under it
+        outside = limit + 1
+        first_j = max(1, depth + 1 - limit)
+        last_j = min(query_length, depth + 1 + limit)
+        while lo < hi:
+            char = terms[lo][depth]
+            child_hi = bisect_left(terms, prefix + chr(ord(char) + 1), lo, hi)
+
+            child_row = [outside] * (query_length + 1)
+            if depth + 1 <= limit:
+                child_row[0] = depth + 1
+            best = child_row[0]
+            for j in range(first_j, last_j + 1):
+                value = min(row[j] + 1, child_row[j - 1] + 1, row[j - 1] + (query[j - 1] != char))
+                if (j > 1 and previous_row is not None and query[j - 1] == previous_char
+                        and query[j - 2] == char):
+                    value = min(value, previous_row[j - 2] + 1)
+                child_row[j] = value
+                if value < best:
+                    best = value
+
+            if best <= limit:
+                self._search(query, prefix + char, lo, child_hi, child_row, row, char, limit, found)
+            lo = child_hi
+
+
+ENGINES = {engine.name: engine for engine in (SymSpellEngine, SortedAutomatonEngine)}
+
+
+def create_engine(name=None, max_dictionary_edit_distance=4, prefix_length=7):
+    """A new, empty engine of the configured kind (MATCHING_ENGINE unless name is given)."""
+    name = name or MATCHING_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown matching engine '{name}', expected one of {sorted(ENGINES)}")
+    return ENGINES[name](max_dictionary_edit_distance=max_dictionary_edit_distance, prefix_length=prefix_length)
@@ -1,14 +1,48 @@
 import os
 import sys
 import re
-from flask import Flask, request, jsonify
+import threading
+import time
+import json
+import pickle
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from symspellpy import SymSpell, Verbosity
+from symspellpy import Verbosity
+from symspellpy.suggest_item import SuggestItem
+
+try:
+    from .admission import AdmissionController, AdmissionRejected
+    from .concurrency import MicroBatcher, QueueFull, SingleFlight
+    from .dictionaries import DictionaryRegistry, parse_dictionary_spec
+    from .engines import MATCHING_ENGINE, create_engine
+    from .medicine_records import DosageIndex, parse_medicine_name
+    from .memory_introspection import AllocationTrace, memory_report
+    from .profiler import RequestProfiler, collapsed_output, pstats_output
+    from .query_log import QueryLog, ResultCache
+    from .usage_counts import ServedCounter, build_hot_index, load_usage_counts, merge_usage_counts, top_names
+except ImportError:  # run directly as a script rather than as part of the python package
+    from admission import AdmissionController, AdmissionRejected
+    from concurrency import MicroBatcher, QueueFull, SingleFlight
+    from dictionaries import DictionaryRegistry, parse_dictionary_spec
+    from engines import MATCHING_ENGINE, create_engine
+    from medicine_records import DosageIndex, parse_medicine_name
+    from memory_introspection import AllocationTrace, memory_report
+    from profiler import RequestProfiler, collapsed_output, pstats_output
+    from query_log import QueryLog, ResultCache
+    from usage_counts import ServedCounter, build_hot_index, load_usage_counts, merge_usage_counts, top_names
 
 app = Flask(__name__)
 CORS(app)
+# The full (cold) index: a matching engine from engines.py, SymSpell unless MATCHING_ENGINE says otherwise
 sym_spell = None
 full_med_map = {} 
+# Base name -> (strength, unit, form) records, used for two-stage dosage lookups
+dosage_index = None
+# Prescription usage counts ({lowercased name: count}) and the small "hot" index built from the top of them
+usage_counts = {}
+hot_tier = None
+# Shared string table plus per-dictionary membership bitsets for MEDICINE_DICTIONARIES
+dictionary_registry = None
 
 base_name_to_full_names_map = {}
 
@@ -21,7 +55,97 @@ if os.environ.get('TEST_MODE') == '1':
     print("🧪 Using test database (5K entries) for faster startup")
 else:
     MEDS_FILE_PATH = os.path.join(SCRIPT_DIR, "..", "Temp_database", "medicines_V3.txt")
+# Named dictionaries served from one index, e.g. "national=/data/v3.txt,regional=/data/kerala.txt".
+# Requests pick one with a "dictionary" parameter; the first listed is the default.
+# Unset: a single "default" dictionary read from MEDS_FILE_PATH.
+MEDICINE_DICTIONARIES = parse_dictionary_spec(os.environ.get("MEDICINE_DICTIONARIES")) or [("default", MEDS_FILE_PATH)]
+DEFAULT_DICTIONARY = MEDICINE_DICTIONARIES[0][0]
 MIN_SUGGESTION_CONFIDENCE = 0.1
+# Queries with a dosage match the base name first, then resolve the strength in its group
+DOSAGE_AWARE_LOOKUP_ENABLED = os.environ.get("DOSAGE_AWARE_LOOKUP", "1") == "1"
+# Confidence multiplier when the requested strength/form is not an exact match in the group
+NEAREST_STRENGTH_CONFIDENCE_FACTOR = 0.9
+# Usage counts rank suggestions and pick the HOT_TIER_SIZE names of the hot tier, which is
+# searched before the full index. A hot hit within HOT_TIER_ACCEPT_DISTANCE edits is final
+# (exact matches are checked first, so the full index could not have found anything closer).
+MED_USAGE_COUNTS_FILE = os.environ.get("MED_USAGE_COUNTS_FILE")
+HOT_TIER_SIZE = int(os.environ.get("HOT_TIER_SIZE", "5000"))
+HOT_TIER_ACCEPT_DISTANCE = int(os.environ.get("HOT_TIER_ACCEPT_DISTANCE", "1"))
+# Edge mode: load only the hot names (needs MED_USAGE_COUNTS_FILE)
+HOT_TIER_ONLY = os.environ.get("HOT_TIER_ONLY") == "1"
+# Admin/debug endpoints are off unless explicitly enabled
+ADMIN_ENDPOINTS_ENABLED = os.environ.get("ENABLE_ADMIN_ENDPOINTS") == "1"
+# Record the top allocation sites of the background dictionary load with tracemalloc (slows the load down)
+TRACE_INIT_ALLOCATIONS = os.environ.get("TRACE_INIT_ALLOCATIONS") == "1"
+TRACE_INIT_TOP_N = int(os.environ.get("TRACE_INIT_TOP_N", "25"))
+# Results are cached per normalized query. With QUERY_LOG_PATH set, every served query is
+# appended to a size-rotated log, and the WARMUP_TOP_N most frequent logged queries are
+# replayed into the cache after the dictionary loads, before /ready reports ready.
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "10000"))
+QUERY_LOG_PATH = os.environ.get("QUERY_LOG_PATH")
+QUERY_LOG_MAX_BYTES = int(os.environ.get("QUERY_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+QUERY_LOG_BACKUPS = int(os.environ.get("QUERY_LOG_BACKUPS", "3"))
+WARMUP_TOP_N = int(os.environ.get("WARMUP_TOP_N", "1000"))
+# Micro-batching mode for /suggest_medicine: gather concurrent single-term requests
+# for up to MICRO_BATCH_WINDOW_MS (adapted to load) or MICRO_BATCH_MAX_SIZE terms
+MICRO_BATCHING_ENABLED = os.environ.get("MICRO_BATCHING") == "1"
+MICRO_BATCH_WINDOW_MS = float(os.environ.get("MICRO_BATCH_WINDOW_MS", "5"))
+MICRO_BATCH_MAX_SIZE = int(os.environ.get("MICRO_BATCH_MAX_SIZE", "32"))
+# Admission control for the suggestion endpoints: at most ADMISSION_MAX_CONCURRENT requests
+# matching at once and ADMISSION_MAX_QUEUE waiting; anything beyond that gets a fast 503.
+# RATE_LIMIT_TERMS_PER_SECOND > 0 adds a per-client token bucket charged per term (429).
+# Clients are keyed by address; the X-Client-Id header is only honoured from TRUSTED_PROXIES
+# (comma-separated addresses of proxies that set it, or "unix-uid:N" socket peers).
+ADMISSION_MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT", "4"))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+RATE_LIMIT_TERMS_PER_SECOND = float(os.environ.get("RATE_LIMIT_TERMS_PER_SECOND", "0"))
+RATE_LIMIT_BURST = float(os.environ.get("RATE_LIMIT_BURST", "200"))
+TRUSTED_PROXIES = {address.strip() for address in os.environ.get("TRUSTED_PROXIES", "").split(",") if address.strip()}
+# GET /debug/profile (admin endpoints only): profiles PROFILE_SAMPLE_RATE of the requests
+# (unless ?sample_rate= says otherwise) for up to PROFILE_MAX_SECONDS, sampling stacks
+# every PROFILE_SAMPLE_INTERVAL_MS. Nothing is profiled outside such a window.
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0.1"))
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "60"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+# Seconds clients are told to wait (Retry-After) while the dictionary is still loading
+READY_RETRY_AFTER_SECONDS = int(os.environ.get("READY_RETRY_AFTER_SECONDS", "5"))
+
+# Background load progress, reported by /ready and /health
+load_state = {
+    "status": "not_started",  # not_started -> loading -> ready | failed
+    "progress": 0.0,
+    "loaded_entries": 0,
+    "total_entries": 0,
+    "started_at": None,
+    "finished_at": None,
+    "error": None,
+}
+_init_thread = None
+# Top allocation sites of the dictionary load, when TRACE_INIT_ALLOCATIONS is on
+init_allocation_sites = []
+_init_thread_lock = threading.Lock()
+# Concurrent requests for the same normalized query wait on one lookup
+lookup_flight = SingleFlight()
+# Medicines actually returned to callers, folded into usage_counts on a hot-tier rebuild
+served_counter = ServedCounter()
+tier_stats = {"exact_hits": 0, "hot_hits": 0, "cold_lookups": 0}
+result_cache = ResultCache(RESULT_CACHE_SIZE)
+query_log = QueryLog(QUERY_LOG_PATH, QUERY_LOG_MAX_BYTES, QUERY_LOG_BACKUPS) if QUERY_LOG_PATH else None
+# Cache warm-up from the query log; "blocking" holds /ready at 503 until the startup warm-up is done
+warmup_state = {
+    "status": "disabled" if query_log is None or WARMUP_TOP_N <= 0 else "pending",
+    "blocking": False,
+    "top_n": WARMUP_TOP_N,
+    "queries_replayed": 0,
+    "logged_queries_total": 0,
+    "coverage": 0.0,
+    "duration_seconds": None,
+}
+profiler = RequestProfiler(PROFILE_SAMPLE_INTERVAL_MS)
+admission = AdmissionController(ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE,
+                                queue_timeout_seconds=ADMISSION_QUEUE_TIMEOUT_SECONDS,
+                                rate_per_second=RATE_LIMIT_TERMS_PER_SECOND, burst=RATE_LIMIT_BURST)
 
 
 def get_base_name(med_name):
@@ -69,47 +193,650 @@ def load_medicine_names(filepath):
 
 
 def initialize_symspell():
-    global sym_spell, full_med_map, base_name_to_full_names_map
+    global sym_spell, full_med_map, base_name_to_full_names_map, dosage_index, usage_counts, hot_tier, \
+        dictionary_registry
     if sym_spell is not None:
         print("SymSpell already initialized.")
         return True
 
+    load_state.update(status="loading", progress=0.0, loaded_entries=0, total_entries=0,
+                      started_at=time.time(), finished_at=None, error=None)
     print("Initializing SymSpell dictionary and mappings...")
-    medicine_names_raw = load_medicine_names(MEDS_FILE_PATH)
-    if not medicine_names_raw:
-        print("Error: No medicines loaded. SymSpell cannot be initialized.", file=sys.stderr)
-        return False
+    # (dictionary, name) pairs of every configured dictionary, indexed together below
+    medicine_names_raw = []
+    for dictionary, filepath in MEDICINE_DICTIONARIES:
+        names = load_medicine_names(filepath)
+        if not names:
+            print("Error: No medicines loaded. SymSpell cannot be initialized.", file=sys.stderr)
+            load_state.update(status="failed", finished_at=time.time(),
+                              error=f"No medicines loaded from {filepath}")
+            return False
+        medicine_names_raw.extend((dictionary, name) for name in names)
+
+    new_usage_counts = load_usage_counts(MED_USAGE_COUNTS_FILE)
+    if HOT_TIER_ONLY:
+        hot_names = {name for name, _ in top_names(new_usage_counts, HOT_TIER_SIZE)}
+        medicine_names_raw = [(dictionary, name) for dictionary, name in medicine_names_raw
+                              if name.lower() in hot_names]
+        print(f"🔥 Hot-tier-only mode: serving the {len(medicine_names_raw)} most used medicines")
     
     print(f"Processing {len(medicine_names_raw)} medicine entries...")
-    sym_spell = SymSpell(max_dictionary_edit_distance=4, prefix_length=7)
+    # Build into locals and publish at the end, so request threads never see a half-built index
+    new_sym_spell = create_engine(max_dictionary_edit_distance=4, prefix_length=7)
+    new_full_med_map = {}
+    new_dosage_index = DosageIndex() if DOSAGE_AWARE_LOOKUP_ENABLED else None
+    new_dictionary_registry = DictionaryRegistry(MEDICINE_DICTIONARIES)
     added_to_symspell_lower = set()
 
-    # Process in batches with progress feedback
-    batch_size = 10000
     total_entries = len(medicine_names_raw)
+    load_state["total_entries"] = max(1, total_entries)
     
-    for i, original_name in enumerate(medicine_names_raw):
+    for i, (dictionary, original_name) in enumerate(medicine_names_raw):
+        if i % 1000 == 0:
+            load_state["loaded_entries"] = i
+            load_state["progress"] = round((i / total_entries) * 100, 1)
         # Show progress every 50k entries
         if i > 0 and i % 50000 == 0:
             progress = (i / total_entries) * 100
             print(f"Progress: {progress:.1f}% ({i}/{total_entries})")
         
         lower_name = original_name.lower()
+        new_dictionary_registry.add(dictionary, lower_name)
         if lower_name not in added_to_symspell_lower:
-            sym_spell.create_dictionary_entry(original_name, 1) 
+            # Index the lowercased name: queries are lowercased, and full_med_map restores the casing
+            new_sym_spell.create_dictionary_entry(lower_name, new_usage_counts.get(lower_name, 1)) 
             added_to_symspell_lower.add(lower_name)
-            full_med_map[lower_name] = original_name
+            new_full_med_map[lower_name] = original_name
+            if new_dosage_index is not None:
+                new_dosage_index.add(lower_name)
             
         # Skip complex base name processing for faster startup
         # This will slightly reduce accuracy but dramatically improve startup time
+
+    new_sym_spell.build()
+    if new_dosage_index is not None:
+        new_dosage_index.build()
+        print(f"✅ Dosage index has {len(new_dosage_index.groups)} base names.")
+    new_dictionary_registry.finish()
+    if len(MEDICINE_DICTIONARIES) > 1:
+        print(f"📚 {len(MEDICINE_DICTIONARIES)} dictionaries share {len(new_dictionary_registry.ids)} distinct names.")
+
+    new_hot_tier = None
+    if HOT_TIER_SIZE > 0 and not HOT_TIER_ONLY:
+        ranked = top_names(new_usage_counts, HOT_TIER_SIZE, new_full_med_map)
+        if ranked:
+            new_hot_tier = build_hot_index(ranked)
+            print(f"🔥 Hot tier has {len(ranked)} most used medicines.")
+
+    full_med_map = new_full_med_map
+    dosage_index = new_dosage_index
+    usage_counts = new_usage_counts
+    hot_tier = new_hot_tier
+    dictionary_registry = new_dictionary_registry
+    sym_spell = new_sym_spell
+    load_state.update(status="ready", progress=100.0, loaded_entries=total_entries,
+                      finished_at=time.time())
         
-    print(f"✅ SymSpell dictionary loaded with {len(sym_spell.words)} entries.")
+    print(f"✅ {MATCHING_ENGINE} dictionary loaded with {len(sym_spell)} entries.")
     print(f"✅ Full medication map has {len(full_med_map)} entries.")
+    print(f"⏱️ Dictionary load took {load_state['finished_at'] - load_state['started_at']:.1f}s")
     return True
+
+
+# Module-level structures that make up a loaded dictionary, saved and restored as one snapshot
+SNAPSHOT_GLOBALS = ("sym_spell", "full_med_map", "base_name_to_full_names_map", "dosage_index",
+                    "usage_counts", "hot_tier", "dictionary_registry")
+
+
+def _file_version(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def snapshot_fingerprint():
+    """Settings and source file versions a snapshot of the current configuration is built from."""
+    return {
+        "matching_engine": MATCHING_ENGINE,
+        "dosage_aware_lookup": DOSAGE_AWARE_LOOKUP_ENABLED,
+        "hot_tier_size": HOT_TIER_SIZE,
+        "hot_tier_only": HOT_TIER_ONLY,
+        "dictionaries": [[dictionary, os.path.abspath(path)] for dictionary, path in MEDICINE_DICTIONARIES],
+        "sources": {path: _file_version(path)
+                    for path in [path for _, path in MEDICINE_DICTIONARIES] + [MED_USAGE_COUNTS_FILE] if path},
+    }
+
+
+def read_snapshot_fingerprint(snapshot_path):
+    """The fingerprint stored at the head of a snapshot, or None if it has none (or cannot be read)."""
+    try:
+        with open(snapshot_path, "rb") as f:
+            header = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    return header.get("fingerprint") if isinstance(header, dict) else None
+
+
+def save_snapshot(snapshot_path):
+    """Pickle the loaded dictionary so other processes can restore it without rebuilding."""
+    if sym_spell is None:
+        raise RuntimeError("SymSpell dictionary not initialized.")
+    state = {name: globals()[name] for name in SNAPSHOT_GLOBALS}
+    state["medicine_file"] = MEDS_FILE_PATH
+    tmp_path = snapshot_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        # A small header first, so freshness checks need not unpickle the whole index
+        pickle.dump({"fingerprint": snapshot_fingerprint()}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, snapshot_path)
+    print(f"💾 Saved dictionary snapshot to {snapshot_path}")
+
+
+def load_snapshot(snapshot_path):
+    """
+    Restore a dictionary written by save_snapshot (only load snapshots you created yourself).
+    Raises ValueError if the snapshot was built from other settings or source files.
+    """
+    started_at = time.time()
+    with open(snapshot_path, "rb") as f:
+        header = pickle.load(f)
+        if not isinstance(header, dict) or header.get("fingerprint") != snapshot_fingerprint():
+            raise ValueError(f"Dictionary snapshot {snapshot_path} is stale; rebuild it")
+        state = pickle.load(f)
+    # Snapshots from older builds may lack newer structures; those keep their defaults
+    globals().update({name: state.get(name, globals()[name]) for name in SNAPSHOT_GLOBALS})
+    load_state.update(status="ready", progress=100.0, loaded_entries=len(full_med_map),
+                      total_entries=len(full_med_map), started_at=started_at,
+                      finished_at=time.time(), error=None)
     return True
 
-with app.app_context():
-    initialize_symspell()
+
+def warm_up_cache():
+    """
+    Replay the most frequent logged queries through the cached lookup of the dictionary
+    each was served from, filling the result cache and touching the hot parts of the index.
+    Queries of dictionaries no longer configured are skipped. Coverage is the share of all
+    logged query volume that the replayed queries account for.
+    """
+    if query_log is None or WARMUP_TOP_N <= 0:
+        return warmup_state
+    warmup_state.update(status="running", queries_replayed=0, duration_seconds=None)
+    started_at = time.time()
+    try:
+        top_queries, total = query_log.top_queries(WARMUP_TOP_N)
+        warmup_state["logged_queries_total"] = total
+        covered = 0
+        for query, logged_dictionary, count in top_queries:
+            dictionary = resolve_dictionary(logged_dictionary)
+            if dictionary is None:
+                continue
+            cached_lookup(query, dictionary)
+            covered += count
+            warmup_state["queries_replayed"] += 1
+        warmup_state.update(status="done", coverage=round(covered / total, 4) if total else 0.0)
+        print(f"🔥 Warm-up replayed {warmup_state['queries_replayed']} queries "
+              f"covering {warmup_state['coverage'] * 100:.1f}% of logged traffic")
+    except Exception as e:
+        print(f"Error: Cache warm-up failed: {e}", file=sys.stderr)
+        warmup_state.update(status="failed")
+    finally:
+        warmup_state.update(blocking=False, duration_seconds=round(time.time() - started_at, 2))
+    return warmup_state
+
+
+def _initialize_symspell_safely():
+    global init_allocation_sites
+    warmup_state["blocking"] = warmup_state["status"] == "pending"
+    try:
+        if TRACE_INIT_ALLOCATIONS:
+            with AllocationTrace(TRACE_INIT_TOP_N) as trace:
+                initialize_symspell()
+            init_allocation_sites = trace.sites
+        else:
+            initialize_symspell()
+    except Exception as e:
+        print(f"Error: SymSpell initialization failed: {e}", file=sys.stderr)
+        load_state.update(status="failed", finished_at=time.time(), error=str(e))
+    if sym_spell is not None:
+        warm_up_cache()
+    warmup_state["blocking"] = False
+
+
+def rebuild_hot_tier():
+    """
+    Swap in a freshly built hot tier. With MED_USAGE_COUNTS_FILE set, the counts served
+    since the last rebuild are added to the file as it is now (re-read under a lock, so
+    other workers' counts and offline updates are kept) and the result ranks the tier;
+    without it they are folded into the in-memory usage_counts.
+    """
+    global usage_counts, hot_tier
+    served = served_counter.drain()
+    if MED_USAGE_COUNTS_FILE:
+        try:
+            merged = merge_usage_counts(MED_USAGE_COUNTS_FILE, served)
+        except Exception:
+            served_counter.restore(served)
+            raise
+    else:
+        merged = dict(usage_counts)
+        for name, count in served.items():
+            merged[name] = merged.get(name, 0) + count
+    ranked = top_names(merged, HOT_TIER_SIZE, full_med_map)
+    usage_counts = merged
+    hot_tier = build_hot_index(ranked) if ranked and not HOT_TIER_ONLY else None
+    print(f"🔥 Rebuilt hot tier with {len(ranked)} medicines.")
+    # Rankings may have changed: drop cached results and re-warm in the background
+    result_cache.clear()
+    threading.Thread(target=warm_up_cache, name="cache-warmup", daemon=True).start()
+    return {"hot_tier_size": len(ranked), "counted_medicines": len(merged)}
+
+
+def start_background_initialization():
+    """
+    Load the dictionary in a daemon thread so the server can bind its port
+    (and answer /live) straight away. Safe to call more than once.
+    """
+    global _init_thread
+    if _init_thread is not None:
+        return _init_thread
+    with _init_thread_lock:
+        if _init_thread is None:
+            _init_thread = threading.Thread(target=_initialize_symspell_safely,
+                                            name="symspell-init", daemon=True)
+            _init_thread.start()
+    return _init_thread
+
+
+@app.before_request
+def _ensure_initialization_started():
+    # WSGI servers that import `app` directly (e.g. gunicorn) never run the start scripts
+    start_background_initialization()
+
+
+def not_ready_status():
+    """(status code, body) while the dictionary is unavailable: 503 while loading, 500 if the load failed."""
+    if load_state["status"] == "failed":
+        return 500, {"error": "SymSpell dictionary not initialized.", "details": load_state["error"]}
+    return 503, {
+        "error": "SymSpell dictionary is still loading.",
+        "status": load_state["status"],
+        "progress": load_state["progress"],
+    }
+
+
+def _not_ready_response():
+    status_code, body = not_ready_status()
+    if status_code == 503:
+        return jsonify(body), status_code, {"Retry-After": str(READY_RETRY_AFTER_SECONDS)}
+    return jsonify(body), status_code
+
+
+def normalize_query(input_term):
+    """Turn a raw input term into the query string that is looked up in SymSpell."""
+    input_term_lower = input_term.lower()
+    is_input_with_dosage = has_dosage(input_term)
+
+    if is_input_with_dosage:
+        lookup_query = input_term_lower
+        print(f"  Input has dosage. Querying full term: '{lookup_query}'")
+    else:
+        lookup_query = get_base_name(input_term)
+        if not lookup_query: 
+            lookup_query = input_term_lower
+        print(f"  Input has no dosage. Querying base name: '{lookup_query}'")
+    return lookup_query
+
+
+class InvalidRequest(ValueError):
+    """A request body the suggestion endpoints cannot use; answered with 400."""
+
+
+def request_term(data):
+    """The stripped "term" of a decoded /suggest_medicine body ("" when absent)."""
+    if not isinstance(data, dict):
+        raise InvalidRequest("Request body must be a JSON object")
+    term = data.get("term") or ""
+    if not isinstance(term, str):
+        raise InvalidRequest("'term' must be a string")
+    return term.strip()
+
+
+def request_terms(data):
+    """The stripped "terms" of a decoded /batch_suggest body (null entries become "")."""
+    if not isinstance(data, dict):
+        raise InvalidRequest("Request body must be a JSON object")
+    terms = data.get("terms")
+    if not terms or not isinstance(terms, list):
+        raise InvalidRequest("No 'terms' list provided")
+    if not all(term is None or isinstance(term, str) for term in terms):
+        raise InvalidRequest("Every entry of 'terms' must be a string")
+    return [(term or "").strip() for term in terms]
+
+
+def resolve_dictionary(name):
+    """The dictionary a request asked for (the default when it named none), or None if there is no such dictionary."""
+    if name is not None and not isinstance(name, str):
+        return None
+    name = name or DEFAULT_DICTIONARY
+    return name if name in dict(MEDICINE_DICTIONARIES) else None
+
+
+def unknown_dictionary_body(name):
+    return {"error": f"Unknown dictionary '{name}'",
+            "dictionaries": [dictionary for dictionary, _ in MEDICINE_DICTIONARIES]}
+
+
+def member_filter_for(dictionary):
+    """Membership predicate for lookups in a dictionary, or None when it needs no filtering."""
+    if dictionary_registry is None:
+        return None
+    return dictionary_registry.member_filter(dictionary or DEFAULT_DICTIONARY)
+
+
+def _filtered(suggestions, is_member):
+    if is_member is None:
+        return suggestions
+    return [s for s in suggestions if is_member(s.term)]
+
+
+def lookup_suggestions(lookup_query, max_dist_for_lookup, is_member=None):
+    """
+    SymSpell suggestions for a query: exact names first, then the hot tier, then the full index.
+    With is_member, only names of that dictionary are returned; when none of the closest
+    names belong to it, the farther ones (up to max_dist_for_lookup) are searched as well.
+    """
+    if lookup_query in full_med_map and (is_member is None or is_member(lookup_query)):
+        tier_stats["exact_hits"] += 1
+        return [SuggestItem(lookup_query, 0, usage_counts.get(lookup_query, 1))]
+
+    if hot_tier is not None:
+        suggestions = _filtered(hot_tier.lookup(lookup_query, Verbosity.CLOSEST, max_dist_for_lookup), is_member)
+        if suggestions and suggestions[0].distance <= HOT_TIER_ACCEPT_DISTANCE:
+            tier_stats["hot_hits"] += 1
+            return suggestions
+
+    tier_stats["cold_lookups"] += 1
+    suggestions = _filtered(sym_spell.lookup(lookup_query, Verbosity.CLOSEST, max_dist_for_lookup), is_member)
+    if not suggestions and is_member is not None:
+        suggestions = _filtered(sym_spell.lookup(lookup_query, Verbosity.ALL, max_dist_for_lookup), is_member)
+    return suggestions
+
+
+def _match_dosage_group(query, max_dist_for_lookup, is_member):
+    """The closest base name with at least one record in the dictionary, and its ranked records."""
+    verbosities = (Verbosity.CLOSEST,) if is_member is None else (Verbosity.CLOSEST, Verbosity.ALL)
+    for verbosity in verbosities:
+        for base_suggestion in dosage_index.lookup_base(query.base_name, max_dist_for_lookup, verbosity):
+            ranked = dosage_index.rank_group(query, base_suggestion.term, is_member)
+            if ranked:
+                return base_suggestion, ranked
+    return None, []
+
+
+def lookup_dosage_medicine(lookup_query, is_member=None):
+    """
+    Two-stage lookup for a query with a dosage: fuzzy-match only its base name, then
+    pick the strength and form inside that base name's group by exact or nearest value.
+    Returns the suggestion dict, or None so the caller can fall back to a full-term lookup.
+    """
+    query = parse_medicine_name(lookup_query)
+    if not query.base_name:
+        return None
+
+    max_dist_for_lookup = calculate_max_edit_distance_for_lookup(len(query.base_name))
+    best_base, ranked = _match_dosage_group(query, max_dist_for_lookup, is_member)
+    if best_base is None:
+        return None
+    base_confidence = 1 - (best_base.distance / max(1, max_dist_for_lookup))
+    print(f"  Base name '{query.base_name}' matched '{best_base.term}' (distance={best_base.distance}, raw_confidence={base_confidence:.2f})")
+    if base_confidence < MIN_SUGGESTION_CONFIDENCE:
+        return None
+
+    def confidence_for(strength_distance):
+        factor = 1.0 if strength_distance == 0 else NEAREST_STRENGTH_CONFIDENCE_FACTOR
+        return round(base_confidence * factor, 2)
+
+    best_record, best_strength_distance = ranked[0]
+    best_match_term = full_med_map.get(best_record.name, best_record.name)
+    method = "dosage_exact_strength_match" if best_strength_distance == 0 else "dosage_nearest_strength_match"
+    print(f"  Resolved strength within '{best_base.term}': '{best_match_term}' ({method})")
+
+    alternatives_output = [
+        {"term": full_med_map.get(record.name, record.name), "confidence": confidence_for(strength_distance)}
+        for record, strength_distance in ranked[1:4]
+    ]
+    alternatives_output.sort(key=lambda x: x['confidence'], reverse=True)
+    return {
+        "term": best_match_term,
+        "confidence": confidence_for(best_strength_distance),
+        "method": method,
+        "alternatives": alternatives_output
+    }
+
+
+def lookup_medicine(lookup_query, dictionary=None):
+    """
+    Look up a normalized query and map the best SymSpell hit back to a full medicine name,
+    considering only names of the given dictionary (the default one when None).
+    Returns the suggestion dict, or None when nothing clears MIN_SUGGESTION_CONFIDENCE.
+    """
+    is_member = member_filter_for(dictionary)
+    if dosage_index is not None and has_dosage(lookup_query):
+        result = lookup_dosage_medicine(lookup_query, is_member)
+        if result is not None:
+            return result
+        print("  No base-name match for dosage query. Falling back to full-term lookup.")
+
+    max_dist_for_lookup = calculate_max_edit_distance_for_lookup(len(lookup_query))
+
+    suggestions = lookup_suggestions(lookup_query, max_dist_for_lookup, is_member)
+
+    best_match_term = ""
+    best_match_confidence = 0.0
+    method = "no_match_found"
+    alternatives_output = [] 
+
+    if suggestions:
+        best_raw_suggestion = suggestions[0]
+        current_confidence = 1 - (best_raw_suggestion.distance / max(1, max_dist_for_lookup))
+
+        print(f"  SymSpell best raw suggestion: '{best_raw_suggestion.term}' (distance={best_raw_suggestion.distance}, raw_confidence={current_confidence:.2f})")
+
+        if current_confidence >= MIN_SUGGESTION_CONFIDENCE:
+            matched_symspell_term_lower = best_raw_suggestion.term.lower()
+            if matched_symspell_term_lower in full_med_map:
+                best_match_term = full_med_map[matched_symspell_term_lower]
+                method = "direct_full_name_match"
+                print(f"  Matched directly to a full name: '{best_match_term}'")
+            elif matched_symspell_term_lower in base_name_to_full_names_map:
+                possible_full_names = base_name_to_full_names_map[matched_symspell_term_lower]
+                if possible_full_names:
+                    best_match_term = possible_full_names[0]
+                    method = "base_name_mapped_to_full"
+                    print(f"  Matched to base name. Mapped to full name: '{best_match_term}'")
+                else:
+                    best_match_term = best_raw_suggestion.term 
+                    method = "base_match_no_full_mapping"
+                    print(f"  Matched to base name, but no full mapping found. Returning raw match: '{best_match_term}'")
+            else:
+                best_match_term = best_raw_suggestion.term 
+                method = "unclassified_symspell_match"
+                print(f"  Matched unclassified term: '{best_match_term}'")
+
+            best_match_confidence = current_confidence
+            seen_terms_for_alternatives = {best_match_term.lower()} 
+            for s in suggestions[1:4]:
+                alt_confidence = 1 - (s.distance / max(1, max_dist_for_lookup))
+                if alt_confidence >= MIN_SUGGESTION_CONFIDENCE:
+                    alt_term_lower = s.term.lower()
+                    final_alt_term = s.term 
+
+                    if alt_term_lower in full_med_map:
+                        final_alt_term = full_med_map[alt_term_lower]
+                    elif alt_term_lower in base_name_to_full_names_map:
+                        if base_name_to_full_names_map[alt_term_lower]:
+                            final_alt_term = base_name_to_full_names_map[alt_term_lower][0]
+                    
+                    if final_alt_term.lower() not in seen_terms_for_alternatives:
+                        alternatives_output.append({
+                            "term": final_alt_term,
+                            "confidence": round(alt_confidence, 2)
+                        })
+                        seen_terms_for_alternatives.add(final_alt_term.lower())
+                else:
+                    print(f"  Skipping alternative '{s.term}' due to low confidence ({alt_confidence:.2f})")
+
+            alternatives_output.sort(key=lambda x: x['confidence'], reverse=True)
+        else:
+            print(f"  Best raw suggestion '{best_raw_suggestion.term}' has confidence {current_confidence:.2f}, which is below threshold {MIN_SUGGESTION_CONFIDENCE}. No match returned.")
+    else:
+        print(f"  No suggestions found by SymSpell for '{lookup_query}'. Returning empty.")
+
+    if not best_match_term:
+        return None
+    return {
+        "term": best_match_term,
+        "confidence": round(best_match_confidence, 2),
+        "method": method,
+        "alternatives": alternatives_output
+    }
+
+
+def _count_dictionary_requests(dictionary, count):
+    if dictionary_registry is not None:
+        dictionary_registry.requests[dictionary or DEFAULT_DICTIONARY] += count
+
+
+def match_medicine(input_term, dictionary=None):
+    """
+    Matching core shared by the HTTP endpoints: normalize the term, then look it up
+    in the given dictionary (the default one when None).
+    Concurrent requests for the same normalized query share one lookup.
+    Returns the suggestion dict (read-only, it may be shared) or None.
+    """
+    with profiler.request():
+        _count_dictionary_requests(dictionary, 1)
+        lookup_query = normalize_query(input_term)
+        if not lookup_query: 
+            print("  Processed query became empty. Returning empty result.")
+            return None
+        result = cached_lookup(lookup_query, dictionary)
+        _record_served(lookup_query, result, dictionary)
+        return result
+
+
+def cached_lookup(lookup_query, dictionary=None):
+    """Result cache in front of the single-flight lookup of a normalized query in a dictionary."""
+    key = (dictionary or DEFAULT_DICTIONARY, lookup_query)
+    found, result = result_cache.get(key)
+    if not found:
+        result = lookup_flight.do(key, lookup_medicine, lookup_query, dictionary)
+        result_cache.put(key, result)
+    return result
+
+
+def _record_served(lookup_query, result, dictionary=None):
+    if result:
+        served_counter.add(result["term"].lower())
+    if query_log is not None:
+        query_log.record(lookup_query, result["term"] if result else "", dictionary or DEFAULT_DICTIONARY)
+
+
+def match_medicines(input_terms, dictionary=None):
+    """
+    Batched matching core: normalize every term, then look up each distinct query once
+    in the given dictionary (the default one when None).
+    Returns one entry per input term: the suggestion dict, None, or the Exception
+    raised while matching that term (so one bad term does not fail the batch).
+    """
+    with profiler.request():
+        _count_dictionary_requests(dictionary, len(input_terms))
+        queries = []
+        for term in input_terms:
+            try:
+                queries.append(normalize_query(term))
+            except Exception as e:
+                queries.append(e)
+
+        results_by_query = {}
+        for query in queries:
+            if isinstance(query, Exception) or not query or query in results_by_query:
+                continue
+            try:
+                results_by_query[query] = cached_lookup(query, dictionary)
+            except Exception as e:
+                results_by_query[query] = e
+
+        results = [query if isinstance(query, Exception) else results_by_query.get(query) for query in queries]
+        for query, result in zip(queries, results):
+            if query and not isinstance(result, Exception):
+                _record_served(query, result, dictionary)
+        return results
+
+
+def _match_micro_batch(input_terms):
+    # A dispatched batch takes one admission slot, however many requests it answers. Its
+    # requests have been waiting since the oldest arrived, so the batch only waits out the
+    # rest of ADMISSION_QUEUE_TIMEOUT_SECONDS; if no slot frees up by then, all of them get 503.
+    waited = time.monotonic() - micro_batcher.dispatching_since
+    with admission.admit(None, 0, timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS - waited):
+        return match_medicines(input_terms)
+
+
+# Queued terms are waiting requests: beyond the batch being gathered, at most ADMISSION_MAX_QUEUE
+micro_batcher = (
+    MicroBatcher(_match_micro_batch, max_batch_size=MICRO_BATCH_MAX_SIZE,
+                 max_window_ms=MICRO_BATCH_WINDOW_MS, name="suggest-micro-batcher",
+                 max_queue=MICRO_BATCH_MAX_SIZE + ADMISSION_MAX_QUEUE)
+    if MICRO_BATCHING_ENABLED else None
+)
+
+
+def uses_micro_batcher(dictionary):
+    """Whether suggest_term sends terms for this dictionary through the micro-batcher."""
+    return micro_batcher is not None and (dictionary or DEFAULT_DICTIONARY) == DEFAULT_DICTIONARY
+
+
+def suggest_term(input_term, dictionary=None):
+    """
+    Single-term entry point for the servers; terms for the default dictionary go
+    through the micro-batcher when it is enabled. Micro-batched terms are matched
+    under the batch's admission slot, so callers admit them with hold_slot=False.
+    May raise AdmissionRejected when the micro-batcher's queue is full or its batch
+    could not get a slot.
+    """
+    if uses_micro_batcher(dictionary):
+        try:
+            return micro_batcher.submit(input_term)
+        except QueueFull:
+            raise admission.queue_full() from None
+    return match_medicine(input_term, dictionary)
+
+
+def client_id_for(client_header, remote_addr):
+    """
+    Rate-limit key: the caller's address, or the X-Client-Id header it sends when the
+    caller is one of TRUSTED_PROXIES (anyone else could pick a fresh id per request).
+    """
+    if client_header and remote_addr in TRUSTED_PROXIES:
+        return client_header
+    return remote_addr or "unknown"
+
+
+def _rejection_response(e):
+    print(f"  Rejected request ({e.status_code}): {e.reason}")
+    return jsonify({"error": e.reason}), e.status_code, {"Retry-After": str(e.retry_after)}
+
+
+def _admit_request(cost, hold_slot=True):
+    """Admit the current request or return the 429/503 response that rejects it."""
+    try:
+        client_id = client_id_for(request.headers.get("X-Client-Id"), request.remote_addr)
+        return admission.admit(client_id, cost, hold_slot), None
+    except AdmissionRejected as e:
+        return None, _rejection_response(e)
 
 
 @app.route("/suggest_medicine", methods=["POST"])
@@ -119,153 +846,267 @@ def suggest_medicine():
     Applies strict confidence thresholding.
     """
     if sym_spell is None:
-        return jsonify({"error": "SymSpell dictionary not initialized."}), 500
+        return _not_ready_response()
 
-    data = request.get_json()
-    input_term = data.get("term", "").strip()
+    # Bodies are parsed whatever their Content-Type, as the ASGI server does
+    data = request.get_json(force=True, silent=True)
+    try:
+        input_term = request_term(data)
+    except InvalidRequest as e:
+        return jsonify({"error": str(e)}), 400
     if not input_term:
         print("  No 'term' provided in request. Returning empty.")
         return jsonify([]) 
+    requested_dictionary = data.get("dictionary") or request.args.get("dictionary")
+    dictionary = resolve_dictionary(requested_dictionary)
+    if dictionary is None:
+        return jsonify(unknown_dictionary_body(requested_dictionary)), 400
 
     print(f"\n--- SUGGESTION REQUEST FOR: '{input_term}' ---")
 
+    ticket, rejection = _admit_request(1, hold_slot=not uses_micro_batcher(dictionary))
+    if rejection:
+        return rejection
     try:
-        input_term_lower = input_term.lower()
-        is_input_with_dosage = has_dosage(input_term)
-
-        if is_input_with_dosage:
-            lookup_query = input_term_lower
-            print(f"  Input has dosage. Querying full term: '{lookup_query}'")
-        else:
-            lookup_query = get_base_name(input_term)
-            if not lookup_query: 
-                lookup_query = input_term_lower
-            print(f"  Input has no dosage. Querying base name: '{lookup_query}'")
-
-        if not lookup_query: 
-            print("  Processed query became empty. Returning empty result.")
+        with ticket:
+            result = suggest_term(input_term, dictionary)
+        if result is None:
             return jsonify([])
+        return jsonify([result])
 
-        max_dist_for_lookup = calculate_max_edit_distance_for_lookup(len(lookup_query))
-
-        suggestions = sym_spell.lookup(
-            lookup_query,
-            Verbosity.CLOSEST, 
-            max_edit_distance=max_dist_for_lookup,
-            transfer_casing=False 
-        )
-
-        best_match_term = ""
-        best_match_confidence = 0.0
-        method = "no_match_found"
-        alternatives_output = [] 
-
-        if suggestions:
-            best_raw_suggestion = suggestions[0]
-            current_confidence = 1 - (best_raw_suggestion.distance / max(1, max_dist_for_lookup))
-
-            print(f"  SymSpell best raw suggestion: '{best_raw_suggestion.term}' (distance={best_raw_suggestion.distance}, raw_confidence={current_confidence:.2f})")
-
-            if current_confidence >= MIN_SUGGESTION_CONFIDENCE:
-                matched_symspell_term_lower = best_raw_suggestion.term.lower()
-                if matched_symspell_term_lower in full_med_map:
-                    best_match_term = full_med_map[matched_symspell_term_lower]
-                    method = "direct_full_name_match"
-                    print(f"  Matched directly to a full name: '{best_match_term}'")
-                elif matched_symspell_term_lower in base_name_to_full_names_map:
-                    possible_full_names = base_name_to_full_names_map[matched_symspell_term_lower]
-                    if possible_full_names:
-                        best_match_term = possible_full_names[0]
-                        method = "base_name_mapped_to_full"
-                        print(f"  Matched to base name. Mapped to full name: '{best_match_term}'")
-                    else:
-                        best_match_term = best_raw_suggestion.term 
-                        method = "base_match_no_full_mapping"
-                        print(f"  Matched to base name, but no full mapping found. Returning raw match: '{best_match_term}'")
-                else:
-                    best_match_term = best_raw_suggestion.term 
-                    method = "unclassified_symspell_match"
-                    print(f"  Matched unclassified term: '{best_match_term}'")
-
-                best_match_confidence = current_confidence
-                seen_terms_for_alternatives = {best_match_term.lower()} 
-                for s in suggestions[1:4]:
-                    alt_confidence = 1 - (s.distance / max(1, max_dist_for_lookup))
-                    if alt_confidence >= MIN_SUGGESTION_CONFIDENCE:
-                        alt_term_lower = s.term.lower()
-                        final_alt_term = s.term 
-
-                        if alt_term_lower in full_med_map:
-                            final_alt_term = full_med_map[alt_term_lower]
-                        elif alt_term_lower in base_name_to_full_names_map:
-                            if base_name_to_full_names_map[alt_term_lower]:
-                                final_alt_term = base_name_to_full_names_map[alt_term_lower][0]
-                        
-                        if final_alt_term.lower() not in seen_terms_for_alternatives:
-                            alternatives_output.append({
-                                "term": final_alt_term,
-                                "confidence": round(alt_confidence, 2)
-                            })
-                            seen_terms_for_alternatives.add(final_alt_term.lower())
-                    else:
-                        print(f"  Skipping alternative '{s.term}' due to low confidence ({alt_confidence:.2f})")
-
-                alternatives_output.sort(key=lambda x: x['confidence'], reverse=True)
-            else:
-                print(f"  Best raw suggestion '{best_raw_suggestion.term}' has confidence {current_confidence:.2f}, which is below threshold {MIN_SUGGESTION_CONFIDENCE}. No match returned.")
-        else:
-            print(f"  No suggestions found by SymSpell for '{lookup_query}'. Returning empty.")
-
-        if not best_match_term:
-            return jsonify([])
-        return jsonify([{
-            "term": best_match_term,
-            "confidence": round(best_match_confidence, 2),
-            "method": method,
-            "alternatives": alternatives_output
-        }])
-
+    except AdmissionRejected as e:
+        return _rejection_response(e)
     except Exception as e:
         print(f"An unexpected error occurred during suggestion processing: {e}", file=sys.stderr)
         return jsonify({"error": str(e), "message": "Internal server error during suggestion processing."}), 500
 
 
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def wants_ndjson(stream_param, accept_header):
+    """Batch results are streamed as NDJSON on ?stream=1 or Accept: application/x-ndjson."""
+    return stream_param == "1" or NDJSON_MIMETYPE in (accept_header or "")
+
+
+def batch_result_line(index, term, result):
+    """One NDJSON line of a streamed batch: the input position, the input and its match."""
+    if isinstance(result, Exception):
+        print(f"An unexpected error occurred while matching '{term}': {result}", file=sys.stderr)
+        result = None
+    return json.dumps({
+        "index": index,
+        "input": term,
+        "term": result["term"] if result else "",
+        "confidence": result["confidence"] if result else 0.0,
+    }) + "\n"
+
+
+def _iter_ndjson_batch(terms, ticket, dictionary):
+    # The admission ticket is held until the last line is sent (or the client goes away)
+    with ticket:
+        for index, term in enumerate(terms):
+            result = match_medicines([term], dictionary)[0]
+            yield batch_result_line(index, term, result)
+
+
 @app.route("/batch_suggest", methods=["POST"])
 def batch_suggest():
     if sym_spell is None:
-        return jsonify({"error": "SymSpell dictionary not initialized."}), 500
+        return _not_ready_response()
+
+    data = request.get_json(force=True, silent=True)
+    try:
+        cleaned_terms = request_terms(data)
+    except InvalidRequest as e:
+        return jsonify({"error": str(e)}), 400
+    requested_dictionary = data.get("dictionary") or request.args.get("dictionary")
+    dictionary = resolve_dictionary(requested_dictionary)
+    if dictionary is None:
+        return jsonify(unknown_dictionary_body(requested_dictionary)), 400
 
-    data = request.get_json()
-    terms = data.get("terms", [])
-    if not terms:
-        return jsonify({"error": "No 'terms' list provided"}), 400
+    # Batches are charged one rate-limit token per term
+    ticket, rejection = _admit_request(len(cleaned_terms))
+    if rejection:
+        return rejection
+    if wants_ndjson(request.args.get("stream"), request.headers.get("Accept", "")):
+        response = Response(stream_with_context(_iter_ndjson_batch(cleaned_terms, ticket, dictionary)), mimetype=NDJSON_MIMETYPE)
+        response.call_on_close(ticket.release)
+        return response
 
+    with ticket:
+        batch_results = match_medicines(cleaned_terms, dictionary)
     results = []
-    for term in terms:
-        with app.test_request_context("/suggest_medicine", method="POST", json={"term": term}):
-            response = suggest_medicine()
-            if response.status_code == 200 and isinstance(response.get_json(), list) and len(response.get_json()) > 0:
-                results.append(response.get_json()[0]["term"])
-            else:
-                results.append("")
+    for term, result in zip(cleaned_terms, batch_results):
+        if isinstance(result, Exception):
+            print(f"An unexpected error occurred while matching '{term}': {result}", file=sys.stderr)
+            result = None
+        results.append(result["term"] if result else "")
     return jsonify(results)
 
 
+@app.route("/live", methods=["GET"])
+def liveness_check():
+    """Liveness probe: the process is up and serving, whether or not the dictionary is loaded."""
+    return jsonify({"status": "alive"}), 200
+
+
+@app.route("/ready", methods=["GET"])
+def readiness_check():
+    """Readiness probe: 200 once the dictionary is loaded and warmed up, 503 with progress until then."""
+    status_code, body = readiness_status()
+    if status_code != 200:
+        return jsonify(body), status_code, {"Retry-After": str(READY_RETRY_AFTER_SECONDS)}
+    return jsonify(body), 200
+
+
+def readiness_status():
+    """(status code, body) for /ready, shared by the Flask and ASGI servers."""
+    body = dict(load_state, warmup=dict(warmup_state))
+    if sym_spell is None:
+        return (500 if load_state["status"] == "failed" else 503), body
+    if warmup_state["blocking"]:
+        return 503, body
+    return 200, body
+
+
+@app.route("/admin/hot_tier/rebuild", methods=["POST"])
+def rebuild_hot_tier_endpoint():
+    """Rebuild the hot tier from the usage counts file (re-read) plus what this process has served since."""
+    if not ADMIN_ENDPOINTS_ENABLED:
+        return jsonify({"error": "Not found"}), 404
+    if sym_spell is None:
+        return _not_ready_response()
+    return jsonify(rebuild_hot_tier()), 200
+
+
+def memory_structures():
+    """(name, object) pairs of the in-process dictionary, in the order /debug/memory measures them."""
+    return (sym_spell.memory_structures() if sym_spell else []) + [
+        ("full_med_map", full_med_map),
+        ("base_name_to_full_names_map", base_name_to_full_names_map),
+        ("dosage_index_groups", getattr(dosage_index, "groups", None)),
+        ("dosage_index_base_symspell", getattr(dosage_index, "base_sym_spell", None)),
+        ("hot_tier", hot_tier),
+        ("usage_counts", usage_counts),
+        ("dictionary_registry", dictionary_registry),
+    ]
+
+
+def memory_report_payload(include=None):
+    """Body of /debug/memory, shared by the Flask and ASGI servers; include is a comma-separated name filter."""
+    structures = memory_structures()
+    if include:
+        wanted = set(include.split(","))
+        structures = [(name, obj) for name, obj in structures if name in wanted]
+    report = memory_report(structures)
+    report["init_allocation_sites"] = init_allocation_sites
+    return report
+
+
+@app.route("/debug/memory", methods=["GET"])
+def debug_memory():
+    """
+    Deep size and entry count of each dictionary structure, process RSS, and the
+    tracemalloc sites of the load (TRACE_INIT_ALLOCATIONS=1). Walking the SymSpell
+    deletes table takes a while on the full database; ?include=a,b limits the report.
+    """
+    if not ADMIN_ENDPOINTS_ENABLED:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(memory_report_payload(request.args.get("include"))), 200
+
+
+def profile_response(args):
+    """
+    Run a /debug/profile request (blocking for its duration), shared by the Flask and ASGI
+    servers; args maps the query parameters. Returns (status code, body, headers) where
+    body is a dict to send as JSON for errors, else the profile with its Content-Type in headers.
+    """
+    try:
+        seconds = float(args.get("seconds", "10"))
+        sample_rate = float(args.get("sample_rate", PROFILE_SAMPLE_RATE))
+    except ValueError:
+        return 400, {"error": "'seconds' and 'sample_rate' must be numbers"}, {}
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        return 400, {"error": f"'seconds' must be between 0 and {PROFILE_MAX_SECONDS:g}"}, {}
+    output_format = args.get("format", "collapsed")
+    if output_format not in ("collapsed", "pstats"):
+        return 400, {"error": "'format' must be 'collapsed' or 'pstats'"}, {}
+
+    try:
+        window = profiler.profile(seconds, sample_rate, output_format)
+    except RuntimeError as e:
+        return 409, {"error": str(e)}, {}
+    headers = {
+        "X-Profile-Requests-Seen": str(window.requests_seen),
+        "X-Profile-Requests-Profiled": str(window.requests_profiled),
+        "X-Profile-Samples": str(window.samples),
+    }
+    if output_format == "collapsed":
+        headers["Content-Type"] = "text/plain; charset=utf-8"
+        return 200, collapsed_output(window).encode("utf-8"), headers
+    headers["Content-Type"] = "application/octet-stream"
+    headers["Content-Disposition"] = "attachment; filename=medcipher.pstats"
+    return 200, pstats_output(window), headers
+
+
+@app.route("/debug/profile", methods=["GET"])
+def debug_profile():
+    """
+    Profile live matching work for ?seconds= (default 10) and return it for flame graphs:
+    ?format=collapsed (default) samples the stacks of the sampled requests' threads,
+    ?format=pstats runs them under cProfile and returns a dump_stats file.
+    ?sample_rate= is the share of requests profiled (default PROFILE_SAMPLE_RATE).
+    """
+    if not ADMIN_ENDPOINTS_ENABLED:
+        return jsonify({"error": "Not found"}), 404
+    status_code, body, headers = profile_response(request.args)
+    if isinstance(body, dict):
+        return jsonify(body), status_code
+    return Response(body, status=status_code, headers=headers)
+
+
 @app.route("/health", methods=["GET"])
 def health_check():
     """API endpoint for health checks."""
-    return jsonify({
+    return jsonify(health_payload()), 200
+
+
+def health_payload():
+    """Body of /health, shared by the Flask and ASGI servers."""
+    return {
         "status": "ok",
         "symspell_initialized": sym_spell is not None,
-        "symspell_dictionary_size": len(sym_spell.words) if sym_spell else 0,
+        "load": load_state,
+        "coalescing": lookup_flight.stats(),
+        "micro_batching": micro_batcher.stats() if micro_batcher else {"enabled": False},
+        "admission": admission.stats(),
+        "profiling": {"running": profiler.running},
+        "result_cache": result_cache.stats(),
+        "warmup": warmup_state,
+        "matching_engine": MATCHING_ENGINE,
+        "symspell_dictionary_size": len(sym_spell) if sym_spell else 0,
         "full_med_map_size": len(full_med_map) if full_med_map else 0,
         "base_to_full_names_map_size": len(base_name_to_full_names_map) if base_name_to_full_names_map else 0,
+        "dosage_index": dosage_index.stats() if dosage_index else {"enabled": False},
+        "tiers": dict(tier_stats,
+                      hot_tier_size=len(hot_tier) if hot_tier else 0,
+                      hot_tier_only=HOT_TIER_ONLY,
+                      counted_medicines=len(usage_counts),
+                      served_since_rebuild=len(served_counter)),
         "medicine_file": MEDS_FILE_PATH,
+        "dictionaries": dictionary_registry.stats() if dictionary_registry else {
+            "default": DEFAULT_DICTIONARY,
+            "dictionaries": {name: {"file": path} for name, path in MEDICINE_DICTIONARIES},
+        },
         "min_suggestion_confidence_threshold": MIN_SUGGESTION_CONFIDENCE
-    }), 200
+    }
 
 if __name__ == "__main__":
     if not os.path.exists(MEDS_FILE_PATH):
         print(f"Warning: Medicine file not found at {MEDS_FILE_PATH}. Please ensure it exists.", file=sys.stderr)
     print("\nStarting Flask server...")
+    # The debug reloader re-runs this script in a child process; only load there
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_initialization()
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,122 @@
+import math
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from symspellpy import Verbosity
+
+try:
+    from .engines import create_engine
+except ImportError:  # run directly as a script rather than as part of the python package
+    from engines import create_engine
+
+# A strength and its unit ("500mg", "0.5 %", "10 iu") or the "BL 40" style suffix.
+# (?!\w) instead of a closing \b so that "0.5%" followed by a space still matches.
+DOSAGE_RE = re.compile(
+    r"\b(?:(\d+(?:\.\d+)?)\s*(mg|mcg|g|ml|%|iu|units?)|(bl)\s*(\d+))(?!\w)",
+    flags=re.IGNORECASE
+)
+FORM_RE = re.compile(
+    r"\b(tablet|capsule|injection|syrup|cream|ointment|drop|solution|suspension|powder|gel|lotion|spray|patch|vial)s?\b",
+    flags=re.IGNORECASE
+)
+
+
+class MedicineRecord(NamedTuple):
+    """A medicine name split into base name, strengths, units and dosage form."""
+    name: str
+    base_name: str
+    strengths: Tuple[float, ...]
+    units: Tuple[str, ...]
+    form: Optional[str]
+
+
+def _normalize_unit(unit):
+    unit = unit.lower()
+    return "units" if unit in ("unit", "units") else unit
+
+
+def parse_medicine_name(name):
+    """
+    Parse a medicine name such as "Amoxycillin 125mg/31.25mg Suspension" into a
+    MedicineRecord. The base name is lowercased with strengths, units and forms removed.
+    """
+    strengths = []
+    units = []
+    for match in DOSAGE_RE.finditer(name):
+        if match.group(3):
+            strengths.append(float(match.group(4)))
+            units.append("bl")
+        else:
+            strengths.append(float(match.group(1)))
+            units.append(_normalize_unit(match.group(2)))
+
+    form_match = FORM_RE.search(name)
+    form = form_match.group(1).lower() if form_match else None
+
+    base = FORM_RE.sub(" ", DOSAGE_RE.sub(" ", name))
+    # Drop separators left behind by combination strengths ("100mg/500mg" -> "/")
+    base = " ".join(token for token in base.lower().split() if any(c.isalnum() for c in token))
+    return MedicineRecord(name, base, tuple(strengths), tuple(units), form)
+
+
+def _strength_distance(query, record):
+    """How far apart two strength lists are: 0.0 for an exact match, inf when units differ."""
+    if query.units != record.units:
+        return math.inf
+    return sum(abs(math.log((q + 1e-9) / (r + 1e-9))) for q, r in zip(query.strengths, record.strengths))
+
+
+class DosageIndex:
+    """
+    Medicine names grouped by base name, with a small matching-engine index over the base names.
+
+    Dosage queries fuzzy-match only the base name, then pick the strength and form
+    inside the matched group by exact or nearest numeric value, so "50mg" vs "500mg"
+    is a different strength rather than a one-character typo.
+    """
+
+    def __init__(self, max_dictionary_edit_distance=4, prefix_length=7):
+        self.groups: Dict[str, List[MedicineRecord]] = {}
+        self.base_sym_spell = create_engine(max_dictionary_edit_distance=max_dictionary_edit_distance,
+                                            prefix_length=prefix_length)
+
+    def add(self, name):
+        record = parse_medicine_name(name)
+        if record.base_name:
+            self.groups.setdefault(record.base_name, []).append(record)
+        return record
+
+    def build(self):
+        """Index the base names; groups with more entries rank higher among equal-distance bases."""
+        for base_name, records in self.groups.items():
+            self.base_sym_spell.create_dictionary_entry(base_name, len(records))
+        self.base_sym_spell.build()
+
+    def lookup_base(self, base_name, max_edit_distance, verbosity=Verbosity.CLOSEST):
+        return self.base_sym_spell.lookup(base_name, verbosity, max_edit_distance)
+
+    def rank_group(self, query, base_name, is_member=None):
+        """
+        Records of a base-name group ordered best first for the query's strengths and form,
+        restricted to names accepted by is_member when given. Records whose strengths cannot
+        be compared with the query's (other units, or a different number of strengths) are
+        left out, so a group with none comparable gives an empty list.
+        Returns (record, strength_distance) pairs.
+        """
+        ranked = []
+        for record in self.groups.get(base_name, []):
+            if is_member is not None and not is_member(record.name):
+                continue
+            distance = _strength_distance(query, record) if query.strengths else 0.0
+            if math.isinf(distance):
+                continue
+            form_mismatch = 0 if query.form is None or record.form == query.form else 1
+            ranked.append(((distance, form_mismatch, len(record.name)), record, distance))
+        ranked.sort(key=lambda item: item[0])
+        return [(record, distance) for _, record, distance in ranked]
+
+    def stats(self):
+        return {
+            "base_names": len(self.groups),
+            "records": sum(len(records) for records in self.groups.values()),
+        }
@@ -0,0 +1,111 @@
+import gc
+import sys
+import tracemalloc
+from types import FunctionType, ModuleType
+
+_ATOMIC_TYPES = (str, bytes, int, float, complex, bool, type(None))
+_SKIPPED_TYPES = (type, ModuleType, FunctionType)
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Bytes reachable from obj: containers, their items and instance attributes.
+
+    Objects whose id is already in seen are not counted again, so measuring
+    several structures with one shared seen set attributes shared objects
+    (e.g. name strings referenced from two maps) to the first structure only.
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIPPED_TYPES):
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        if isinstance(current, _ATOMIC_TYPES):
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        else:
+            attributes = getattr(current, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for slot in getattr(type(current), "__slots__", ()):
+                if hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+    return size
+
+
+def process_rss_bytes():
+    """Current resident set size (Linux /proc), falling back to the peak RSS from getrusage."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+
+def memory_report(structures):
+    """
+    Deep size and entry count for each (name, object) pair, measured in order with a
+    shared seen set, plus process RSS and the part of it not explained by the structures.
+    """
+    gc.collect()
+    seen = set()
+    report = []
+    total = 0
+    for name, obj in structures:
+        size = deep_sizeof(obj, seen) if obj is not None else 0
+        total += size
+        report.append({
+            "name": name,
+            "deep_size_bytes": size,
+            "deep_size_mb": round(size / (1024 * 1024), 2),
+            "entries": len(obj) if hasattr(obj, "__len__") else getattr(obj, "word_count", None),
+        })
+    rss = process_rss_bytes()
+    return {
+        "structures": report,
+        "structures_total_mb": round(total / (1024 * 1024), 2),
+        "process_rss_mb": round(rss / (1024 * 1024), 2) if rss else None,
+        "other_mb": round((rss - total) / (1024 * 1024), 2) if rss else None,
+    }
+
+
+class AllocationTrace:
+    """Capture the top-N allocation sites (file:line) of a block of code with tracemalloc."""
+
+    def __init__(self, top_n=25):
+        self.top_n = top_n
+        self.sites = []
+        self._started_here = False
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_here = True
+        return self
+
+    def __exit__(self, *exc_info):
+        snapshot = tracemalloc.take_snapshot()
+        if self._started_here:
+            tracemalloc.stop()
+        self.sites = [{
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_mb": round(stat.size / (1024 * 1024), 2),
+            "allocations": stat.count,
+        } for stat in snapshot.statistics("lineno")[:self.top_n]]
@@ -134,8 +134,8 @@ class CombinationMedicationProcessor:
         
         return sorted(list(final_variations))
     
-    def process_txt_file(self, input_file: str, output_file: str = None):
-        """Process medications from text file"""
+    def process_txt_file(self, input_file: str, output_file: str = None, catalog_dir: str = None):
+        """Process medications from text file, optionally also writing a columnar catalog"""
         try:
             with open(input_file, 'r', encoding='utf-8') as f:
                 lines = f.readlines()
@@ -161,6 +161,14 @@ class CombinationMedicationProcessor:
             print(f"Net change: {processed_count - original_count:+d} medications")
             print(f"Results saved to {output_file}")
             
+            if catalog_dir is not None:
+                # Imported here: the catalog pulls in numpy and symspellpy, which plain processing does not need
+                try:
+                    from .catalog import write_catalog
+                except ImportError:  # run directly as a script rather than as part of the python package
+                    from catalog import write_catalog
+                write_catalog(processed_meds, catalog_dir)
+            
             return processed_meds
             
         except FileNotFoundError:
@@ -213,8 +221,7 @@ def main():
 if __name__ == "__main__":
     main()
 
-
-processor = CombinationMedicationProcessor()
-processor.process_txt_file('medicines_final_processed.txt')
+    processor = CombinationMedicationProcessor()
+    processor.process_txt_file('medicines_final_processed.txt')
 
 
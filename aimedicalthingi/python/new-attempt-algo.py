@@ -1,21 +1,70 @@
+import os
+import pickle
 import re
 from difflib import SequenceMatcher
-from collections import defaultdict
+from collections import Counter, defaultdict
 import unicodedata
 
+# Bump when the layout of the persisted indexes changes, so stale cache files are rebuilt
+INDEX_CACHE_VERSION = 1
+
 class MedicationMatcher:
-    def __init__(self, medication_file_path):
+    def __init__(self, medication_file_path, cache_indexes=True):
         """
         Initialize with medication file path
         medication_file_path: path to the text file containing medication names
+        cache_indexes: persist the built indexes next to the file
+            (<file>.matcher-index.pickle) and reuse them while the file is unchanged
         """
+        self.use_phonetic_index = True
+        self.index_cache_path = medication_file_path + ".matcher-index.pickle" if cache_indexes else None
+        if self._load_index_cache(medication_file_path):
+            return
+
         self.original_medications = self._load_medications(medication_file_path)
         self.medications = [self._normalize_text(med) for med in self.original_medications]
         self.med_dict = {self._normalize_text(med): med for med in self.original_medications}
         
-        self.soundex_index = self._build_soundex_index()
+        self.phonetic_index = self._build_phonetic_index()
         self.first_char_index = self._build_first_char_index()
         self.word_index = self._build_word_index()
+        self._save_index_cache(medication_file_path)
+    
+    _CACHED_ATTRIBUTES = ('original_medications', 'medications', 'med_dict',
+                          'phonetic_index', 'first_char_index', 'word_index')
+    
+    def _source_signature(self, file_path):
+        stat = os.stat(file_path)
+        return {'version': INDEX_CACHE_VERSION, 'mtime': stat.st_mtime, 'size': stat.st_size}
+    
+    def _load_index_cache(self, file_path):
+        """Restore the indexes from the cache file if it was built from the current medication file"""
+        if not self.index_cache_path or not os.path.exists(self.index_cache_path):
+            return False
+        try:
+            with open(self.index_cache_path, 'rb') as f:
+                state = pickle.load(f)
+            if state.get('source') != self._source_signature(file_path):
+                return False
+            for name in self._CACHED_ATTRIBUTES:
+                setattr(self, name, state[name])
+            return True
+        except Exception as e:
+            print(f"Ignoring unreadable matcher index cache {self.index_cache_path}: {e}")
+            return False
+    
+    def _save_index_cache(self, file_path):
+        if not self.index_cache_path or not self.original_medications:
+            return
+        state = {name: getattr(self, name) for name in self._CACHED_ATTRIBUTES}
+        state['source'] = self._source_signature(file_path)
+        tmp_path = self.index_cache_path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.index_cache_path)
+        except OSError as e:
+            print(f"Could not write matcher index cache {self.index_cache_path}: {e}")
     
     def _load_medications(self, file_path):
         """Load medications from file, handling encoding issues"""
@@ -89,13 +138,29 @@ class MedicationMatcher:
         
         return word_map
         
-    def _build_soundex_index(self):
-        """Build soundex index for phonetic matching"""
-        soundex_map = defaultdict(list)
-        for med in self.medications:
-            soundex_code = self._soundex(med.split()[0]) 
-            soundex_map[soundex_code].append(med)
-        return soundex_map
+    def _phonetic_words(self, text):
+        """Words worth a phonetic key: at least two characters, letters only (no dosages)"""
+        return [w for w in text.split() if len(w) > 1 and w.isalpha()]
+    
+    def _phonetic_keys(self, word):
+        """Soundex and Metaphone keys of one word, tagged so the two code spaces never collide"""
+        keys = {'S' + self._soundex(word)}
+        metaphone = self._metaphone(word)
+        if metaphone:
+            keys.add('M' + metaphone)
+        return keys
+    
+    def _build_phonetic_index(self):
+        """
+        Build a multi-key phonetic index: Soundex and Metaphone keys of every word
+        of every name, each key mapping to the positions of the names containing it
+        """
+        phonetic_map = defaultdict(set)
+        for position, med in enumerate(self.medications):
+            for word in self._phonetic_words(med):
+                for key in self._phonetic_keys(word):
+                    phonetic_map[key].add(position)
+        return {key: sorted(positions) for key, positions in phonetic_map.items()}
     
     def _build_first_char_index(self):
         """Build first character index for faster searching"""
@@ -132,6 +197,80 @@ class MedicationMatcher:
         result = result[:4].ljust(4, '0')
         return result
     
+    def _metaphone(self, word, max_length=6):
+        """Compact Metaphone: the consonant skeleton of a word as it sounds (initial vowel kept)"""
+        word = ''.join(c for c in word.upper() if 'A' <= c <= 'Z')
+        if not word:
+            return ""
+        if word[:2] in ('AE', 'GN', 'KN', 'PN', 'WR'):
+            word = word[1:]
+        elif word[0] == 'X':
+            word = 'S' + word[1:]
+        elif word[:2] == 'WH':
+            word = 'W' + word[2:]
+        
+        vowels = 'AEIOU'
+        simple = {'F': 'F', 'J': 'J', 'L': 'L', 'M': 'M', 'N': 'N', 'R': 'R', 'Q': 'K', 'V': 'F', 'Z': 'S'}
+        result = ''
+        i = 0
+        while i < len(word) and len(result) < max_length:
+            c = word[i]
+            prev = word[i - 1] if i > 0 else ''
+            next1 = word[i + 1] if i + 1 < len(word) else ''
+            next2 = word[i + 2] if i + 2 < len(word) else ''
+            i += 1
+            if c == prev and c != 'C':
+                continue
+            if c in vowels:
+                if i == 1:
+                    result += c
+            elif c in simple:
+                result += simple[c]
+            elif c == 'B':
+                if not (prev == 'M' and not next1):
+                    result += 'B'
+            elif c == 'C':
+                if next1 == 'H' or (next1 == 'I' and next2 == 'A'):
+                    result += 'X'
+                elif next1 and next1 in 'EIY':
+                    if prev != 'S':
+                        result += 'S'
+                else:
+                    result += 'K'
+            elif c == 'D':
+                result += 'J' if next1 == 'G' and next2 and next2 in 'EIY' else 'T'
+            elif c == 'G':
+                if next1 == 'H' and next2 and next2 not in vowels:
+                    continue
+                if next1 == 'N' and (not next2 or word[i + 1:] == 'NED'):
+                    continue
+                result += 'J' if next1 and next1 in 'EIY' and prev != 'G' else 'K'
+            elif c == 'H':
+                if prev and prev in 'CSPTG':
+                    continue
+                if next1 and next1 in vowels and not (prev and prev in vowels):
+                    result += 'H'
+            elif c == 'K':
+                if prev != 'C':
+                    result += 'K'
+            elif c == 'P':
+                result += 'F' if next1 == 'H' else 'P'
+            elif c == 'S':
+                result += 'X' if next1 == 'H' or (next1 == 'I' and next2 and next2 in 'OA') else 'S'
+            elif c == 'T':
+                if next1 == 'I' and next2 and next2 in 'OA':
+                    result += 'X'
+                elif next1 == 'H':
+                    result += '0'
+                elif not (next1 == 'C' and next2 == 'H'):
+                    result += 'T'
+            elif c in 'WY':
+                if next1 and next1 in vowels:
+                    result += c
+            elif c == 'X':
+                result += 'KS'
+        return result[:max_length]
+    
     def _preprocess_input(self, query):
         """Preprocess input query"""
         if not query:
@@ -174,8 +313,38 @@ class MedicationMatcher:
         final_score = base_score + prefix_bonus + char_bonus - length_penalty
         return max(0.0, min(1.0, final_score))
     
+    def _get_phonetic_candidates(self, query):
+        """
+        Names sharing a phonetic key with every query word, or, when no name matches all
+        of them, with as many query words as any name does. Dosage and formulation words
+        are left out of the query, since they match a large share of the list.
+        """
+        query_words = set(self._phonetic_words(self._extract_base_name(query)))
+        if not query_words:
+            return []
+        
+        words_matched = Counter()
+        for word in query_words:
+            positions = set()
+            for key in self._phonetic_keys(word):
+                positions.update(self.phonetic_index.get(key, ()))
+            words_matched.update(positions)
+        if not words_matched:
+            return []
+        
+        most_words = max(words_matched.values())
+        return [self.medications[position] for position, count in words_matched.items() if count == most_words]
+    
     def _get_candidate_pool(self, query):
         """Get a smaller pool of candidates for efficient matching"""
+        if self.use_phonetic_index:
+            candidates = self._get_phonetic_candidates(query)
+            if candidates:
+                return candidates
+        return self._get_broad_candidate_pool(query)
+    
+    def _get_broad_candidate_pool(self, query):
+        """Fallback pool: same first character, shared or overlapping words, else everything"""
         candidates = set()
         
         if query:
@@ -183,10 +352,6 @@ class MedicationMatcher:
             candidates.update(self.first_char_index.get(first_char, []))
             
             query_words = query.split()
-            if query_words:
-                soundex_code = self._soundex(query_words[0])
-                candidates.update(self.soundex_index.get(soundex_code, []))
-            
             for word in query_words:
                 if len(word) > 2:
                     candidates.update(self.word_index.get(word, []))
@@ -49,6 +49,10 @@ class MedicationProcessor:
         
         # Create regex pattern for forms (case insensitive)
         self.forms_pattern = r'\b(?:' + '|'.join(self.forms) + r')\b'
+        
+        # Single-pass compiled versions for vectorized (pandas Series.str) processing
+        self.dosage_regex = re.compile('|'.join(f'(?:{p})' for p in self.dosage_patterns), re.IGNORECASE)
+        self.forms_regex = re.compile(self.forms_pattern, re.IGNORECASE)
     
     def remove_dosage(self, med_name: str) -> str:
         """Remove dosage information from medication name"""
@@ -107,8 +111,8 @@ class MedicationProcessor:
         
         return sorted(list(all_variations))
     
-    def process_txt_file(self, input_file: str, output_file: str = None):
-        """Process medications from text file"""
+    def process_txt_file(self, input_file: str, output_file: str = None, catalog_dir: str = None):
+        """Process medications from text file, optionally also writing a columnar catalog"""
         try:
             # Read text file
             with open(input_file, 'r', encoding='utf-8') as f:
@@ -135,6 +139,14 @@ class MedicationProcessor:
             print(f"Generated {len(processed_meds)} total variations")
             print(f"Results saved to {output_file}")
             
+            if catalog_dir is not None:
+                # Imported here: the catalog pulls in numpy and symspellpy, which plain processing does not need
+                try:
+                    from .catalog import write_catalog
+                except ImportError:  # run directly as a script rather than as part of the python package
+                    from catalog import write_catalog
+                write_catalog(processed_meds, catalog_dir)
+            
             return processed_meds
             
         except FileNotFoundError:
@@ -142,8 +154,14 @@ class MedicationProcessor:
         except Exception as e:
             print(f"Error processing file: {e}")
     
-    def process_csv(self, input_file: str, output_file: str, med_column: str = 'medication'):
-        """Process medications from CSV file"""
+    def process_csv(self, input_file: str, output_file: str, med_column: str = 'medication',
+                    chunksize: int = None):
+        """
+        Process medications from CSV file.
+        With chunksize set, the file is streamed in chunks (see process_csv_chunked).
+        """
+        if chunksize:
+            return self.process_csv_chunked(input_file, output_file, med_column, chunksize)
         try:
             # Read CSV
             df = pd.read_csv(input_file)
@@ -169,6 +187,102 @@ class MedicationProcessor:
             
         except Exception as e:
             print(f"Error processing CSV: {e}")
+    
+    def _strip_series(self, series: pd.Series, regex) -> pd.Series:
+        """Vectorized counterpart of remove_dosage/remove_forms for a whole Series"""
+        return series.str.replace(regex, '', regex=True).str.replace(r'\s+', ' ', regex=True).str.strip()
+    
+    def generate_variations_series(self, medications: pd.Series) -> pd.Series:
+        """
+        Vectorized generate_variations over a Series: original, without dosage,
+        without forms and base name, de-duplicated in first-seen order.
+        Dosage patterns are applied as one alternation instead of one re.sub each.
+        """
+        originals = medications.astype(str).str.strip()
+        no_dosage = self._strip_series(originals, self.dosage_regex)
+        no_forms = self._strip_series(originals, self.forms_regex)
+        base_names = self._strip_series(no_dosage, self.forms_regex)
+        variations = pd.concat([originals, no_dosage, no_forms, base_names], ignore_index=True)
+        return variations[variations != ''].drop_duplicates()
+    
+    def process_csv_chunked(self, input_file: str, output_file: str, med_column: str = 'medication',
+                            chunksize: int = 100_000):
+        """
+        Process a CSV that may be larger than memory, chunksize rows at a time.
+        
+        Each chunk is reduced to its unique medications and expanded with
+        generate_variations_series; variations not written before are appended
+        to output_file straight away. Output is .parquet (needs pyarrow) or CSV,
+        in first-seen order rather than sorted. Only the set of distinct
+        variations is kept in memory, not the rows.
+        """
+        writer = None
+        seen = set()
+        rows_read = 0
+        try:
+            if output_file.endswith('.parquet'):
+                writer = _ParquetVariationWriter(output_file)
+            else:
+                writer = _CsvVariationWriter(output_file)
+            
+            reader = pd.read_csv(input_file, usecols=[med_column], chunksize=chunksize, dtype={med_column: str})
+            for chunk in reader:
+                rows_read += len(chunk)
+                medications = chunk[med_column].dropna().drop_duplicates()
+                variations = self.generate_variations_series(medications)
+                new_variations = variations[~variations.isin(seen)]
+                if len(new_variations):
+                    seen.update(new_variations.tolist())
+                    writer.write(new_variations)
+                print(f"  {rows_read} rows read, {len(seen)} unique variations so far")
+            
+            print(f"Processed {rows_read} CSV rows")
+            print(f"Generated {len(seen)} total variations")
+            print(f"Results saved to {output_file}")
+            return len(seen)
+        
+        except Exception as e:
+            print(f"Error processing CSV: {e}")
+        finally:
+            if writer is not None:
+                writer.close()
+
+
+class _CsvVariationWriter:
+    """Streams variation chunks to a single-column CSV"""
+    
+    def __init__(self, output_file: str):
+        self.output_file = output_file
+        self.header_written = False
+    
+    def write(self, variations: pd.Series):
+        pd.DataFrame({'medication': variations}).to_csv(
+            self.output_file, mode='a' if self.header_written else 'w',
+            header=not self.header_written, index=False)
+        self.header_written = True
+    
+    def close(self):
+        if not self.header_written:
+            pd.DataFrame({'medication': []}).to_csv(self.output_file, index=False)
+
+
+class _ParquetVariationWriter:
+    """Streams variation chunks as row groups of a single-column Parquet file"""
+    
+    def __init__(self, output_file: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet output needs pyarrow: pip install pyarrow")
+        self._pa = pa
+        self._writer = pq.ParquetWriter(output_file, pa.schema([('medication', pa.string())]))
+    
+    def write(self, variations: pd.Series):
+        self._writer.write_table(self._pa.table({'medication': variations.tolist()}))
+    
+    def close(self):
+        self._writer.close()
 
 # Example usage and testing
 def main():
@@ -223,12 +337,17 @@ To use this program with your medicines_final.txt file:
 
 2. You can also specify a custom output file:
    processor.process_txt_file('medicines_final.txt', 'expanded_medicines.txt')
+   # Add catalog_dir='expanded_medicines.catalog' to also write the columnar catalog (see catalog.py)
 
 3. For individual medication processing:
    processor = MedicationProcessor()
    variations = processor.generate_variations("Amoxycillin 500mg Capsule")
 
-4. To process and get results in memory:
+4. For CSV exports too large for memory, stream them in chunks (CSV or .parquet output):
+   processor = MedicationProcessor()
+   processor.process_csv('pharmacy_export.csv', 'variations.parquet', med_column='medication', chunksize=200_000)
+
+5. To process and get results in memory:
    processor = MedicationProcessor()
    with open('medicines_final.txt', 'r') as f:
        medications = [line.strip() for line in f if line.strip()]
@@ -0,0 +1,153 @@
+import contextlib
+import cProfile
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+_NOT_PROFILED = contextlib.nullcontext()
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame):
+    """Root-first "a;b;c" stack of a frame, the line format flame graph tools read."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class _ProfileWindow:
+    """One profiling run: which requests to sample, until when, and what was collected."""
+
+    def __init__(self, mode, seconds, sample_rate):
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.ends_at = time.monotonic() + seconds
+        self.requests_seen = 0
+        self.requests_profiled = 0
+        self.samples = 0
+        self.stacks = Counter()
+        self.stats = None
+        self.active_threads = set()
+
+
+class RequestProfiler:
+    """
+    On-demand profiler for a sample of live requests.
+
+    Code paths wrap their work in request(); while no profile is running that is
+    one attribute check. profile() opens a window for a number of seconds, during
+    which each request is picked with probability sample_rate and either:
+
+    - "collapsed": a sampler thread reads the stacks of the picked request threads
+      every interval_ms via sys._current_frames() and counts identical stacks, or
+    - "pstats": the picked request runs under cProfile, and the per-request
+      profiles are merged into one pstats table.
+
+    Only one window runs at a time.
+    """
+
+    def __init__(self, interval_ms=5.0):
+        self.interval_seconds = max(0.001, interval_ms / 1000.0)
+        self._window = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._window is not None
+
+    def request(self):
+        """Context manager around one request's work; profiles it if a window is open and it is sampled."""
+        window = self._window
+        if window is None:
+            return _NOT_PROFILED
+        window.requests_seen += 1
+        if random.random() >= window.sample_rate:
+            return _NOT_PROFILED
+        return self._profiled_request(window)
+
+    @contextlib.contextmanager
+    def _profiled_request(self, window):
+        window.requests_profiled += 1
+        if window.mode == "collapsed":
+            ident = threading.get_ident()
+            window.active_threads.add(ident)
+            try:
+                yield
+            finally:
+                window.active_threads.discard(ident)
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler already owns this thread
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                if window.stats is None:
+                    window.stats = pstats.Stats(profile)
+                else:
+                    window.stats.add(profile)
+
+    def profile(self, seconds, sample_rate=1.0, mode="collapsed"):
+        """
+        Profile requests for the given number of seconds (blocking) and return the window.
+        Raises RuntimeError if another profile is already running.
+        """
+        if mode not in ("collapsed", "pstats"):
+            raise ValueError(f"Unknown profile format '{mode}'")
+        if not self._start_lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running.")
+        try:
+            window = _ProfileWindow(mode, seconds, min(1.0, max(0.0, sample_rate)))
+            self._window = window
+            if mode == "collapsed":
+                self._sample_until_done(window)
+            else:
+                time.sleep(seconds)
+            self._window = None
+            # Requests picked just before the window closed may still be finishing
+            time.sleep(self.interval_seconds)
+            return window
+        finally:
+            self._window = None
+            self._start_lock.release()
+
+    def _sample_until_done(self, window):
+        own_ident = threading.get_ident()
+        while time.monotonic() < window.ends_at:
+            time.sleep(self.interval_seconds)
+            if not window.active_threads:
+                continue
+            frames = sys._current_frames()
+            for ident in list(window.active_threads):
+                frame = frames.get(ident)
+                if frame is not None and ident != own_ident:
+                    window.stacks[collapse_stack(frame)] += 1
+                    window.samples += 1
+
+
+def collapsed_output(window):
+    """Collapsed stacks, one "stack count" line each, most frequent first."""
+    return "".join(f"{stack} {count}\n" for stack, count in window.stacks.most_common())
+
+
+def pstats_output(window):
+    """The merged profile in the binary format of pstats.Stats.dump_stats (snakeviz, flameprof, gprof2dot)."""
+    return marshal.dumps(window.stats.stats if window.stats is not None else {})
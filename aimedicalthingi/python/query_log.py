@@ -0,0 +1,99 @@
+import logging
+import os
+import threading
+from collections import Counter, OrderedDict
+from logging.handlers import RotatingFileHandler
+
+
+class ResultCache:
+    """Thread-safe LRU cache of suggestion results keyed on the normalized query (None results included)."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max(0, int(max_entries))
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns (found, value)."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class QueryLog:
+    """
+    Compact on-disk log of normalized queries and the medicine returned for each,
+    one "query<TAB>result<TAB>dictionary" line per request, rotated by size.
+    Lines written before the dictionary column existed read as dictionary None.
+    """
+
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.path = path
+        self.backup_count = backup_count
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._logger = logging.getLogger(f"medcipher.query_log.{os.path.abspath(path)}")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        if not self._logger.handlers:
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(handler)
+
+    def record(self, query, result_term, dictionary=None):
+        query = query.replace("\t", " ").replace("\n", " ")
+        self._logger.info("%s\t%s\t%s", query, result_term or "", dictionary or "")
+
+    def files(self):
+        """The current log and its rotated backups, oldest last."""
+        candidates = [self.path] + [f"{self.path}.{i}" for i in range(1, self.backup_count + 1)]
+        return [path for path in candidates if os.path.exists(path)]
+
+    def top_queries(self, limit):
+        """
+        The limit most frequent (query, dictionary) pairs across the current log and its backups.
+        Returns ([(query, dictionary, count), ...], total number of logged queries).
+        """
+        counts = Counter()
+        for path in self.files():
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    fields = line.rstrip("\n").split("\t")
+                    query = fields[0].strip()
+                    dictionary = fields[2].strip() if len(fields) > 2 else ""
+                    if query:
+                        counts[query, dictionary or None] += 1
+        top = [(query, dictionary, count) for (query, dictionary), count in counts.most_common(limit)]
+        return top, sum(counts.values())
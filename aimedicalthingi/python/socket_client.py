@@ -0,0 +1,158 @@
+"""
+Client for the medicine API's Unix socket sidecar (see socket_sidecar.py).
+
+Wire format, both directions: a 4-byte big-endian length followed by one
+msgpack map. Requests are {"id": n, "op": "suggest", "term": ...},
+{"id": n, "op": "batch", "terms": [...]} or {"id": n, "op": "ping"}, with an
+optional "dictionary" naming one of the server's MEDICINE_DICTIONARIES;
+responses carry the same id and either "result" or "error". Requests may be
+pipelined: any number can be sent before reading, and responses may come
+back out of order.
+
+    client = MedicineSocketClient("/tmp/medcipher.sock")
+    client.suggest("paracetmol 500mg")       # suggestion dict or None
+    client.suggest_many(ocr_lines)           # pipelined, results in input order
+
+A client holds one connection and is not thread-safe; use one per thread.
+"""
+import socket
+import struct
+
+import msgpack
+
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+
+class SocketProtocolError(Exception):
+    """The peer closed the connection mid-frame or sent an oversized frame."""
+
+
+class SidecarError(Exception):
+    """The sidecar answered a request with an error; retry_after is set while it is loading or busy."""
+
+    def __init__(self, error, retry_after=None):
+        super().__init__(error)
+        self.error = error
+        self.retry_after = retry_after
+
+
+def pack_frame(message):
+    payload = msgpack.packb(message, use_bin_type=True)
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def _recv_exactly(sock, size):
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            if buffer:
+                raise SocketProtocolError("Connection closed in the middle of a frame")
+            return None
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+def read_frame(sock):
+    """Read one frame from sock; returns the decoded message, or None when the peer has closed."""
+    header = _recv_exactly(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise SocketProtocolError(f"Frame of {size} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    payload = _recv_exactly(sock, size)
+    if payload is None:
+        raise SocketProtocolError("Connection closed in the middle of a frame")
+    return msgpack.unpackb(payload, raw=False)
+
+
+class MedicineSocketClient:
+    """Blocking client for the sidecar with optional request pipelining."""
+
+    def __init__(self, path, timeout=30.0, client_id=None, dictionary=None):
+        self.client_id = client_id
+        self.dictionary = dictionary
+        self._next_id = 0
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(path)
+
+    def close(self):
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _send(self, op, **fields):
+        self._next_id += 1
+        message = dict(fields, id=self._next_id, op=op)
+        if self.client_id:
+            message["client"] = self.client_id
+        if self.dictionary:
+            message["dictionary"] = self.dictionary
+        self._sock.sendall(pack_frame(message))
+        return self._next_id
+
+    def _receive(self):
+        response = read_frame(self._sock)
+        if response is None:
+            raise SocketProtocolError("Sidecar closed the connection")
+        return response
+
+    @staticmethod
+    def _unwrap(response):
+        if "error" in response:
+            raise SidecarError(response["error"], response.get("retry_after"))
+        return response["result"]
+
+    def _call(self, op, **fields):
+        request_id = self._send(op, **fields)
+        response = self._receive()
+        if response.get("id") != request_id:
+            raise SocketProtocolError("Out-of-order response on a non-pipelined call")
+        return self._unwrap(response)
+
+    def ping(self):
+        return self._call("ping")
+
+    def suggest(self, term):
+        """Same matching as POST /suggest_medicine: the suggestion dict, or None."""
+        return self._call("suggest", term=term)
+
+    def batch(self, terms):
+        """Same matching as POST /batch_suggest, one suggestion dict (or None) per term."""
+        return self._call("batch", terms=list(terms))
+
+    def suggest_many(self, terms, window=64):
+        """
+        Pipelined suggest for every term: keeps up to window requests in flight
+        and returns the results in input order. If any term failed, the first
+        SidecarError is raised once every response has been read.
+        """
+        terms = list(terms)
+        results = [None] * len(terms)
+        position_by_id = {}
+        errors = []
+
+        def receive_one():
+            response = self._receive()
+            position = position_by_id.pop(response["id"])
+            try:
+                results[position] = self._unwrap(response)
+            except SidecarError as e:
+                errors.append(e)
+
+        for position, term in enumerate(terms):
+            position_by_id[self._send("suggest", term=term)] = position
+            if len(position_by_id) >= window:
+                receive_one()
+        while position_by_id:
+            receive_one()
+        if errors:
+            raise errors[0]
+        return results
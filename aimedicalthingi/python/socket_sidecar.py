@@ -0,0 +1,196 @@
+"""
+Unix domain socket sidecar for co-located callers (e.g. the OCR pipeline).
+
+Serves the same matching core as POST /suggest_medicine and POST /batch_suggest
+without HTTP parsing, CORS or JSON: each request and response is a
+length-prefixed msgpack map (the format is described in socket_client.py).
+Each connection can pipeline requests; they are matched concurrently on a
+shared thread pool and answered as they finish, tagged with the request id.
+Requests pass through the same admission control as the HTTP endpoints.
+
+Enabled by setting UDS_SOCKET_PATH for start_api_server.py / start_asgi_server.py,
+or run on its own (dictionary load plus socket, no HTTP):
+
+    python python/socket_sidecar.py /tmp/medcipher.sock
+"""
+import os
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from . import medical_autocorrect_api as api
+    from .socket_client import SocketProtocolError, pack_frame, read_frame
+except ImportError:  # run directly as a script rather than as part of the python package
+    import medical_autocorrect_api as api
+    from socket_client import SocketProtocolError, pack_frame, read_frame
+
+UDS_SOCKET_PATH = os.environ.get("UDS_SOCKET_PATH")
+UDS_SOCKET_MODE = int(os.environ.get("UDS_SOCKET_MODE", "660"), 8)
+UDS_WORKERS = int(os.environ.get("UDS_WORKERS", str(min(8, os.cpu_count() or 1))))
+# Pipelined requests one connection may have in flight before its reader stops reading
+UDS_MAX_IN_FLIGHT = int(os.environ.get("UDS_MAX_IN_FLIGHT", "128"))
+
+executor = ThreadPoolExecutor(max_workers=UDS_WORKERS, thread_name_prefix="uds-lookup")
+sidecar_stats = {"connections": 0, "open_connections": 0, "requests": 0, "errors": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key, delta=1):
+    with _stats_lock:
+        sidecar_stats[key] += delta
+
+
+def _error(request_id, error, retry_after=None):
+    _count("errors")
+    response = {"id": request_id, "error": error}
+    if retry_after is not None:
+        response["retry_after"] = retry_after
+    return response
+
+
+def peer_identity(sock):
+    """Rate-limit key of a connection: the peer's user id where the OS reports it."""
+    if hasattr(socket, "SO_PEERCRED"):
+        try:
+            credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+            _, uid, _ = struct.unpack("3i", credentials)
+            return f"unix-uid:{uid}"
+        except OSError:
+            pass
+    return "unix-socket"
+
+
+def handle_request(message, peer="unix-socket"):
+    """Answer one decoded request map from the given peer (see peer_identity); returns the response map."""
+    request_id = message.get("id") if isinstance(message, dict) else None
+    if not isinstance(message, dict):
+        return _error(request_id, "Request must be a map")
+    op = message.get("op")
+    if op == "ping":
+        status_code, body = api.readiness_status()
+        return {"id": request_id, "result": dict(body, sidecar=dict(sidecar_stats))}
+    if op not in ("suggest", "batch"):
+        return _error(request_id, f"Unknown op {op!r}")
+    if api.sym_spell is None:
+        return _error(request_id, "Medicine dictionary is still loading", api.READY_RETRY_AFTER_SECONDS)
+    dictionary = api.resolve_dictionary(message.get("dictionary"))
+    if dictionary is None:
+        return _error(request_id, api.unknown_dictionary_body(message.get("dictionary"))["error"])
+
+    try:
+        if op == "suggest":
+            input_term = api.request_term(message)
+            if not input_term:
+                return {"id": request_id, "result": None}
+            terms = [input_term]
+        else:
+            terms = api.request_terms(message)
+    except api.InvalidRequest as e:
+        return _error(request_id, str(e))
+
+    hold_slot = op != "suggest" or not api.uses_micro_batcher(dictionary)
+    try:
+        ticket = api.admission.admit(api.client_id_for(message.get("client"), peer), len(terms), hold_slot)
+    except api.AdmissionRejected as e:
+        return _error(request_id, e.reason, e.retry_after)
+    try:
+        with ticket:
+            if op == "suggest":
+                return {"id": request_id, "result": api.suggest_term(input_term, dictionary)}
+            results = []
+            for term, result in zip(terms, api.match_medicines(terms, dictionary)):
+                if isinstance(result, Exception):
+                    print(f"An unexpected error occurred while matching '{term}': {result}", file=sys.stderr)
+                    result = None
+                results.append(result)
+            return {"id": request_id, "result": results}
+    except api.AdmissionRejected as e:
+        return _error(request_id, e.reason, e.retry_after)
+    except Exception as e:
+        print(f"An unexpected error occurred during suggestion processing: {e}", file=sys.stderr)
+        return _error(request_id, str(e))
+
+
+class _ConnectionHandler(socketserver.BaseRequestHandler):
+    """Reads frames off one connection and answers each from the shared pool, in completion order."""
+
+    def handle(self):
+        _count("connections")
+        _count("open_connections")
+        write_lock = threading.Lock()
+        in_flight = threading.BoundedSemaphore(UDS_MAX_IN_FLIGHT)
+        peer = peer_identity(self.request)
+
+        def respond(message):
+            try:
+                frame = pack_frame(handle_request(message, peer))
+                with write_lock:
+                    self.request.sendall(frame)
+            except OSError:
+                pass  # the caller went away; nothing left to answer
+            finally:
+                in_flight.release()
+
+        try:
+            while True:
+                message = read_frame(self.request)
+                if message is None:
+                    return
+                _count("requests")
+                in_flight.acquire()
+                executor.submit(respond, message)
+        except (OSError, SocketProtocolError, ValueError) as e:
+            print(f"Closing sidecar connection: {e}", file=sys.stderr)
+        finally:
+            _count("open_connections", -1)
+
+
+class _SidecarServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def start_socket_sidecar(path):
+    """Bind the sidecar to path (replacing a stale socket file) and serve it from a daemon thread."""
+    if os.path.exists(path):
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise ValueError(f"{path} exists and is not a socket")
+        os.remove(path)
+    server = _SidecarServer(path, _ConnectionHandler)
+    os.chmod(path, UDS_SOCKET_MODE)
+    thread = threading.Thread(target=server.serve_forever, name="uds-sidecar", daemon=True)
+    thread.start()
+    print(f"🔌 Unix socket sidecar listening on {path}")
+    return server
+
+
+def start_socket_sidecar_if_configured():
+    """Start the sidecar when UDS_SOCKET_PATH is set; returns the server or None."""
+    if not UDS_SOCKET_PATH:
+        return None
+    return start_socket_sidecar(UDS_SOCKET_PATH)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else UDS_SOCKET_PATH
+    if not path:
+        print("Usage: python socket_sidecar.py SOCKET_PATH (or set UDS_SOCKET_PATH)", file=sys.stderr)
+        sys.exit(2)
+    server = start_socket_sidecar(path)
+    api.start_background_initialization()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("\n👋 Sidecar stopped by user")
+    finally:
+        server.shutdown()
+        server.server_close()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
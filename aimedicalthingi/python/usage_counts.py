@@ -0,0 +1,127 @@
+import contextlib
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory file locks, merges are only serialized within a process
+    fcntl = None
+
+try:
+    from .engines import create_engine
+except ImportError:  # run directly as a script rather than as part of the python package
+    from engines import create_engine
+
+
+def load_usage_counts(filepath):
+    """
+    Read prescription usage counts from a TSV file of "medicine name<TAB>count" lines.
+    Returns {lowercased name: count}; a missing or unreadable file gives an empty dict.
+    """
+    counts = {}
+    if not filepath:
+        return counts
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            for line in f:
+                name, _, count = line.rstrip("\n").rpartition("\t")
+                name = name.strip().lower()
+                if name and count.strip().isdigit():
+                    counts[name] = counts.get(name, 0) + int(count)
+        print(f"Loaded usage counts for {len(counts)} medicines from {filepath}")
+    except FileNotFoundError:
+        print(f"Warning: Usage counts file '{filepath}' not found.", file=sys.stderr)
+    except Exception as e:
+        print(f"Error reading usage counts file: {e}", file=sys.stderr)
+    return counts
+
+
+def save_usage_counts(filepath, counts):
+    """Write {name: count} as TSV, most used first (atomically, via a temporary file of its own)."""
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(filepath) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(os.path.abspath(filepath)))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for name, count in sorted(counts.items(), key=lambda item: -item[1]):
+                f.write(f"{name}\t{count}\n")
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+_merge_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _locked(filepath):
+    # Serializes merges across threads and, through an advisory lock file, across processes
+    with _merge_lock, open(filepath + ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def merge_usage_counts(filepath, new_counts):
+    """
+    Add new_counts to the counts file and return the merged counts. The file is re-read
+    under a lock, so counts written meanwhile by other processes (or an offline update)
+    are kept rather than overwritten.
+    """
+    with _locked(filepath):
+        merged = load_usage_counts(filepath) if os.path.exists(filepath) else {}
+        for name, count in new_counts.items():
+            merged[name] = merged.get(name, 0) + count
+        save_usage_counts(filepath, merged)
+    return merged
+
+
+def top_names(counts, limit, known_names=None):
+    """The limit most used names, optionally restricted to names present in known_names."""
+    ranked = sorted(counts.items(), key=lambda item: -item[1])
+    if known_names is not None:
+        ranked = [(name, count) for name, count in ranked if name in known_names]
+    return ranked[:limit]
+
+
+def build_hot_index(ranked_names, max_dictionary_edit_distance=4, prefix_length=7):
+    """Small matching-engine index over (lowercased name, count) pairs: the hot tier."""
+    hot_index = create_engine(max_dictionary_edit_distance=max_dictionary_edit_distance,
+                              prefix_length=prefix_length)
+    for name, count in ranked_names:
+        hot_index.create_dictionary_entry(name, max(1, count))
+    hot_index.build()
+    return hot_index
+
+
+class ServedCounter:
+    """Thread-safe tally of the medicines the API actually returned, for ranking and hot-tier rebuilds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def add(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def drain(self):
+        """Return the counts collected so far and start again from zero."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return counts
+
+    def restore(self, counts):
+        """Put drained counts back, e.g. when persisting them failed."""
+        with self._lock:
+            self._counts.update(counts)
+
+    def __len__(self):
+        return len(self._counts)
@@ -13,12 +13,15 @@ sys.path.insert(0, current_dir)
 
 try:
     print("🚀 Starting MedCipher Medicine API...")
-    print("📊 This will load 521K+ medicine entries - please be patient!")
-    print("⏳ Initialization may take 1-2 minutes...")
+    print("📊 521K+ medicine entries will load in the background (1-2 minutes)")
+    print("⏳ Suggestion endpoints return 503 until GET /ready reports ready")
     
-    from python.medical_autocorrect_api import app
+    from python.medical_autocorrect_api import app, start_background_initialization
+    from python.socket_sidecar import start_socket_sidecar_if_configured
     
-    print("\n✅ SymSpell dictionary initialized successfully!")
+    start_background_initialization()
+    # Optional Unix socket listener for co-located callers (UDS_SOCKET_PATH)
+    start_socket_sidecar_if_configured()
     print("🌐 Starting Flask server on http://127.0.0.1:5000")
     print("💡 Press Ctrl+C to stop the server")
     print("=" * 60)
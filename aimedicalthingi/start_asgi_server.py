@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Startup script for the asyncio/ASGI serving mode of the MedCipher Medicine API
+Serves the same endpoints as start_api_server.py through uvicorn, with
+NDJSON streaming for /batch_suggest (?stream=1)
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+try:
+    import uvicorn
+except ImportError:
+    print("❌ The ASGI mode needs uvicorn: pip install uvicorn")
+    sys.exit(1)
+
+try:
+    print("🚀 Starting MedCipher Medicine API (ASGI mode)...")
+    print("📊 Medicine entries load in the background - poll GET /ready")
+    print("🌐 Starting uvicorn on http://127.0.0.1:5000")
+    print("💡 Press Ctrl+C to stop the server")
+    print("=" * 60)
+    
+    # The dictionary load is started by the ASGI lifespan startup event
+    uvicorn.run("python.asgi_app:app", host='127.0.0.1', port=5000,
+                log_level="info", timeout_keep_alive=75)
+    
+except KeyboardInterrupt:
+    print("\n\n👋 Server stopped by user")
+except Exception as e:
+    print(f"\n❌ Error starting server: {e}")
+    sys.exit(1)
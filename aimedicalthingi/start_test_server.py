@@ -17,9 +17,14 @@ try:
     print("🧪 Starting MedCipher API in TEST MODE (5K medicines)")
     print("⚡ Fast startup for development and testing!")
     
-    from python.medical_autocorrect_api import app
+    from python.medical_autocorrect_api import app, start_background_initialization
+    from python.socket_sidecar import start_socket_sidecar_if_configured
     
-    print("\n✅ Test database loaded successfully!")
+    # debug=True runs the app in a reloader child process; only load the dictionary there
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_initialization()
+        start_socket_sidecar_if_configured()
+    print("⏳ Test database loads in the background - poll GET /ready")
     print("🌐 Starting Flask server on http://127.0.0.1:5000")
     print("💡 Press Ctrl+C to stop the server")
     print("=" * 60)